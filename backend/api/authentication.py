@@ -0,0 +1,100 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework.authentication import TokenAuthentication
+
+TOKEN_KEY = 'auth_token:{}'
+TOKEN_USER_KEY = 'auth_token_user:{}'
+
+
+class LocalTokenCache:
+    """LRU токенов в памяти процесса с коротким временем жизни записей."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return user
+
+    def set(self, key, user):
+        with self.lock:
+            self.entries[key] = (
+                user, time.monotonic() + settings.AUTH_TOKEN_LOCAL_TTL)
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.AUTH_TOKEN_LOCAL_SIZE:
+                self.entries.popitem(last=False)
+
+    def discard(self, key=None, user_id=None):
+        with self.lock:
+            if key is not None:
+                self.entries.pop(key, None)
+            if user_id is not None:
+                for cached_key, (user, _) in list(self.entries.items()):
+                    if user.pk == user_id:
+                        del self.entries[cached_key]
+
+
+local_tokens = LocalTokenCache()
+
+
+def shared_cache():
+    """Общий для процессов кэш токенов или None.
+
+    LocMemCache у каждого процесса свой: удалённый при выходе токен
+    оставался бы действительным в остальных воркерах до истечения записи.
+    """
+    cache = caches['default']
+    return None if isinstance(cache, LocMemCache) else cache
+
+
+def invalidate_token(key):
+    local_tokens.discard(key=key)
+    cache = shared_cache()
+    if cache is not None:
+        cache.delete(TOKEN_KEY.format(key))
+
+
+def invalidate_user_tokens(user_id):
+    local_tokens.discard(user_id=user_id)
+    cache = shared_cache()
+    if cache is None:
+        return
+    key = cache.get(TOKEN_USER_KEY.format(user_id))
+    if key is not None:
+        cache.delete_many(
+            [TOKEN_KEY.format(key), TOKEN_USER_KEY.format(user_id)])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Токен-аутентификация без запроса к базе при тёплом кэше."""
+
+    def authenticate_credentials(self, key):
+        user = local_tokens.get(key)
+        if user is None:
+            cache = shared_cache()
+            if cache is not None:
+                user = cache.get(TOKEN_KEY.format(key))
+            if user is None:
+                user, _ = super().authenticate_credentials(key)
+                if cache is not None:
+                    cache.set_many({
+                        TOKEN_KEY.format(key): user,
+                        TOKEN_USER_KEY.format(user.pk): key,
+                    }, settings.AUTH_TOKEN_CACHE_TTL)
+            local_tokens.set(key, user)
+        return copy.copy(user), key
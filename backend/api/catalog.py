@@ -0,0 +1,23 @@
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+
+CATALOG_VERSION_KEY = 'catalog_version'
+
+
+def get_catalog_version():
+    return cache.get_or_set(CATALOG_VERSION_KEY, time.time_ns, None)
+
+
+def bump_catalog_version():
+    cache.set(CATALOG_VERSION_KEY, time.time_ns(), None)
+
+
+def catalog_etag(request, *args, **kwargs):
+    return f'"catalog-{get_catalog_version()}"'
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    return datetime.fromtimestamp(
+        get_catalog_version() / 1e9, tz=timezone.utc)
@@ -1,19 +1,10 @@
 from django.contrib.auth import get_user_model
 from django_filters.rest_framework import FilterSet, filters
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import Recipe, Tag
 
 User = get_user_model()
 
 
-class IngredientFilterSet(FilterSet):
-    name = filters.CharFilter(
-        lookup_expr='startswith')
-
-    class Meta:
-        model = Ingredient
-        fields = ('name', )
-
-
 class RecipeFilterSet(FilterSet):
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
     tags = filters.ModelMultipleChoiceFilter(
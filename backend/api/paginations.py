@@ -1,5 +1,147 @@
-from rest_framework.pagination import PageNumberPagination
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (Cursor, CursorPagination,
+                                       PageNumberPagination)
+from rest_framework.response import Response
+
+COUNT_KEY = 'count:{}'
+
+
+def planner_estimate(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def table_estimate(queryset):
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE relname = %s',
+            [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return queryset.count()
+    return int(row[0])
+
+
+def estimate_count(queryset):
+    vendor = connections[queryset.db].vendor
+    if not queryset.query.has_filters():
+        return cache.get_or_set(
+            COUNT_KEY.format(queryset.model._meta.db_table),
+            lambda: (table_estimate(queryset) if vendor == 'postgresql'
+                     else queryset.count()),
+            settings.APPROXIMATE_COUNT_TIMEOUT,
+        )
+    if vendor == 'postgresql':
+        return planner_estimate(queryset)
+    return None
+
+
+class ApproximateCountPaginator(Paginator):
+    is_approximate = False
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if (estimate is None
+                or estimate < settings.APPROXIMATE_COUNT_THRESHOLD):
+            return super().count
+        self.is_approximate = True
+        return estimate
 
 
 class LimitPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class ApproximateCountPagination(LimitPagination):
+    django_paginator_class = ApproximateCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.page.paginator.count),
+            ('count_is_approximate', self.page.paginator.is_approximate),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class RecipeCursorPagination(CursorPagination):
+    page_size_query_param = 'limit'
+    ordering = ('-pub_date', '-id')
+
+
+class UserCursorPagination(CursorPagination):
+    page_size_query_param = 'limit'
+    ordering = ('-id',)
+
+
+class CursorPaginationMixin:
+    cursor_pagination_class = None
+
+    def use_cursor_pagination(self):
+        params = self.request.query_params
+        return (params.get('pagination') == 'cursor'
+                or 'cursor' in params)
+
+    @property
+    def paginator(self):
+        if (self.cursor_pagination_class is None
+                or not self.use_cursor_pagination()):
+            return super().paginator
+        if not hasattr(self, '_paginator'):
+            self._paginator = self.cursor_pagination_class()
+        return self._paginator
+
+
+class FeedPagination(CursorPagination):
+    page_size_query_param = 'limit'
+
+    def decode_position(self, request):
+        cursor = self.decode_cursor(request)
+        if cursor is None:
+            return None
+        try:
+            pub_date, pk = cursor.position.split('|')
+            position = (parse_datetime(pub_date), int(pk))
+        except (AttributeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def paginate_positions(self, request, get_positions):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        positions = get_positions(
+            self.decode_position(request), self.page_size + 1)
+        self.has_next = len(positions) > self.page_size
+        positions = positions[:self.page_size]
+        if self.has_next:
+            pub_date, pk = positions[-1]
+            self.next_position = f'{pub_date.isoformat()}|{pk}'
+        return positions
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data),
+        ]))
@@ -0,0 +1,135 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import caches
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from recipes.models import Recipe
+from rest_framework import status
+from rest_framework.response import Response
+
+from .catalog import get_catalog_version
+
+LIST_VERSION_KEY = 'recipes:list_version'
+RECIPE_VERSION_KEY = 'recipes:version:{}'
+LIST_KEY = 'recipes:list:{}:{}:{}'
+DETAIL_KEY = 'recipes:detail:{}:{}:{}:{}'
+CACHED_PARAMS = {
+    'author', 'tags', 'page', 'limit', 'pagination', 'cursor', 'personalize',
+}
+
+
+def get_version(key):
+    return caches['responses'].get_or_set(key, time.time_ns, None)
+
+
+def bump_recipe_versions(recipe_ids):
+    version = time.time_ns()
+    versions = {RECIPE_VERSION_KEY.format(pk): version for pk in recipe_ids}
+    versions[LIST_VERSION_KEY] = version
+    caches['responses'].set_many(versions, None)
+
+
+def is_shared(request):
+    return (request.user.is_anonymous
+            or request.query_params.get('personalize') == 'false')
+
+
+def is_cacheable(request):
+    return is_shared(request) and set(request.query_params) <= CACHED_PARAMS
+
+
+def normalize_params(request):
+    return '&'.join(
+        f'{name}={",".join(sorted(request.query_params.getlist(name)))}'
+        for name in sorted(request.query_params)
+    )
+
+
+def params_digest(request):
+    return hashlib.md5(normalize_params(request).encode()).hexdigest()
+
+
+def list_key(request, **kwargs):
+    return LIST_KEY.format(
+        get_version(LIST_VERSION_KEY),
+        request.build_absolute_uri('/'),
+        params_digest(request),
+    )
+
+
+def detail_key(request, pk, **kwargs):
+    return DETAIL_KEY.format(
+        pk,
+        get_version(RECIPE_VERSION_KEY.format(pk)),
+        request.build_absolute_uri('/'),
+        params_digest(request),
+    )
+
+
+def cache_response(get_key):
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if not is_cacheable(request):
+                return method(self, request, *args, **kwargs)
+            key = get_key(request, **kwargs)
+            data = caches['responses'].get(key)
+            if data is not None:
+                return Response(data)
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                caches['responses'].set(key, response.data)
+            return response
+        return wrapper
+    return decorator
+
+
+def make_validators(request, last_modified, discriminator):
+    timestamp = last_modified.timestamp() if last_modified else 0
+    etag = (f'"{discriminator}-{params_digest(request)}-{timestamp}'
+            f'-{get_catalog_version()}"')
+    return etag, int(timestamp)
+
+
+def list_validators(view, request, **kwargs):
+    state = view.filter_queryset(view.get_queryset()).order_by().aggregate(
+        last_modified=Max('updated_at'), count=Count('pk'))
+    return make_validators(
+        request, state['last_modified'], state['count'])
+
+
+def detail_validators(view, request, pk, **kwargs):
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None, None
+    last_modified = Recipe.objects.filter(pk=pk).values_list(
+        'updated_at', flat=True).first()
+    if last_modified is None:
+        return None, None
+    return make_validators(request, last_modified, pk)
+
+
+def conditional_response(get_validators):
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if not is_shared(request):
+                return method(self, request, *args, **kwargs)
+            etag, last_modified = get_validators(self, request, **kwargs)
+            if etag is None:
+                return method(self, request, *args, **kwargs)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if response is not None:
+                return response
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                response['ETag'] = etag
+                response['Last-Modified'] = http_date(last_modified)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,113 @@
+import json
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from recipes.models import Ingredient
+
+from .catalog import get_catalog_version
+from .serializers import IngredientSerializer
+
+
+def to_json(fragments):
+    return b'[' + b','.join(fragments) + b']'
+
+
+def trigrams(text):
+    result = set()
+    for word in text.split():
+        word = f'  {word} '
+        result.update(word[i:i + 3] for i in range(len(word) - 2))
+    return frozenset(result)
+
+
+class IngredientIndex:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.entries = ([], [], [], {})
+
+    def build(self):
+        rows = sorted(
+            (ingredient.name.lower(), ingredient.pk, json.dumps(
+                IngredientSerializer(ingredient).data,
+                ensure_ascii=False,
+                separators=(',', ':'),
+            ).encode())
+            for ingredient in Ingredient.objects.all()
+        )
+        keys = [key for key, _, _ in rows]
+        grams = [trigrams(key) for key in keys]
+        postings = defaultdict(list)
+        for index, entry_grams in enumerate(grams):
+            for gram in entry_grams:
+                postings[gram].append(index)
+        self.entries = (
+            keys,
+            [fragment for _, _, fragment in rows],
+            grams,
+            dict(postings),
+        )
+
+    def refresh(self):
+        version = get_catalog_version()
+        if version == self.version:
+            return
+        with self.lock:
+            if version != self.version:
+                self.build()
+                self.version = version
+
+    def all(self):
+        self.refresh()
+        return to_json(self.entries[1])
+
+    def prefix_range(self, keys, prefix, limit):
+        index = bisect_left(keys, prefix)
+        while (index < len(keys) and limit > 0
+               and keys[index].startswith(prefix)):
+            yield index
+            index += 1
+            limit -= 1
+
+    def startswith(self, prefix, limit=None):
+        self.refresh()
+        keys, fragments, _, _ = self.entries
+        limit = limit or settings.INGREDIENTS_SEARCH_LIMIT
+        return to_json([
+            fragments[index]
+            for index in self.prefix_range(keys, prefix.lower(), limit)
+        ])
+
+    def search(self, query, limit=None):
+        self.refresh()
+        keys, fragments, grams, postings = self.entries
+        query = ' '.join(query.lower().split())
+        limit = limit or settings.INGREDIENTS_SEARCH_LIMIT
+        prefixed = list(self.prefix_range(keys, query, limit))
+        query_grams = trigrams(query)
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(postings.get(gram, ()))
+        seen = set(prefixed)
+        substrings = []
+        similar = []
+        for index, count in shared.items():
+            if index in seen:
+                continue
+            if query in keys[index]:
+                substrings.append((keys[index].index(query), index))
+                continue
+            similarity = count / (
+                len(query_grams) + len(grams[index]) - count)
+            if similarity >= settings.INGREDIENTS_SEARCH_SIMILARITY:
+                similar.append((-similarity, index))
+        ranked = prefixed + [
+            index for _, index in sorted(substrings) + sorted(similar)
+        ]
+        return to_json([fragments[index] for index in ranked[:limit]])
+
+
+ingredient_index = IngredientIndex()
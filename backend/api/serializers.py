@@ -1,27 +1,110 @@
 import base64
+import binascii
+import json
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile
 from django.db import transaction
+from django.http import QueryDict
 from djoser.serializers import UserCreateSerializer, UserSerializer
+from recipes.images import store_original, variant_names
+from recipes.jobs import submit_job
+from recipes.similarity import index_recipes
 from recipes.models import (
-    Ingredient, Recipe, Favorite, ShoppingList, RecipeIngredient, Tag)
+    Ingredient, Job, Recipe, Favorite, ShoppingList,
+    RecipeIngredient, Tag, delete_quietly)
 from rest_framework import serializers, status
 from rest_framework.exceptions import ValidationError
 from rest_framework.fields import SerializerMethodField, ReadOnlyField
+from rest_framework.reverse import reverse
 from users.models import Follow
 
+from .shopping_list import refresh_carts
+
 User = get_user_model()
 
 
+class DecodedImageFile(TemporaryUploadedFile):
+    # Хранилище перемещает временный файл; close() это учитывает,
+    # а финализатор NamedTemporaryFile без явного close() — нет.
+    def __del__(self):
+        self.close()
+
+
 class ImageField64 (serializers.ImageField):
+    default_error_messages = {
+        'max_size': 'Размер изображения не должен превышать {max_size} байт.',
+    }
+    chunk_size = 64 * 1024
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            data = self.decode(data)
+        elif getattr(data, 'size', 0) > settings.IMAGE_UPLOAD_MAX_SIZE:
+            self.fail('max_size', max_size=settings.IMAGE_UPLOAD_MAX_SIZE)
         return super().to_internal_value(data)
 
+    def decode(self, data):
+        header_end = data.find(';base64,')
+        if header_end < 0:
+            self.fail('invalid_image')
+        ext = data[len('data:image/'):header_end]
+        start = header_end + len(';base64,')
+        upload = DecodedImageFile('temp.' + ext, 'image/' + ext, 0, None)
+        try:
+            self.decode_chunks(data, start, upload)
+        except Exception:
+            upload.close()
+            raise
+        upload.flush()
+        upload.size = upload.tell()
+        upload.seek(0)
+        return upload
+
+    def decode_chunks(self, data, start, upload):
+        # Переносы строк и пробелы в base64 допустимы (RFC 2045): они
+        # вырезаются из каждого куска, а неполная четвёрка символов
+        # переходит в следующий.
+        pending = ''
+        try:
+            for offset in range(start, len(data), self.chunk_size):
+                pending += ''.join(
+                    data[offset:offset + self.chunk_size].split())
+                usable = len(pending) - len(pending) % 4
+                upload.write(base64.b64decode(
+                    pending[:usable], validate=True))
+                pending = pending[usable:]
+                if upload.tell() > settings.IMAGE_UPLOAD_MAX_SIZE:
+                    self.fail('max_size',
+                              max_size=settings.IMAGE_UPLOAD_MAX_SIZE)
+            upload.write(base64.b64decode(pending, validate=True))
+        except binascii.Error:
+            self.fail('invalid_image')
+
+
+class ImageVariantsField(serializers.Field):
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        kwargs.setdefault('source', 'image')
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get('request')
+        urls = {
+            variant: default_storage.url(name)
+            for variant, name in variant_names(value.name).items()
+        }
+        if request is None:
+            return urls
+        return {
+            variant: request.build_absolute_uri(url)
+            for variant, url in urls.items()
+        }
+
 
 class CustomUserCreateSerializer(UserCreateSerializer):
     class Meta:
@@ -46,10 +129,18 @@ class CustomUserSerializer(UserSerializer):
             'is_subscribed',
         )
 
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.context.get('personalize', True):
+            fields.pop('is_subscribed')
+        return fields
+
     def get_is_subscribed(self, obj):
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return Follow.objects.filter(
             user=self.context['request'].user, author=obj
         ).exists()
@@ -88,6 +179,7 @@ class RecipeSerializer(serializers.ModelSerializer):
     ingredients = RecipeIngredientSerializer(
         read_only=True, many=True, source='ingredient_recipeingredient')
     image = ImageField64()
+    image_variants = ImageVariantsField()
     is_favorited = SerializerMethodField()
     is_in_shopping_cart = SerializerMethodField()
 
@@ -98,25 +190,35 @@ class RecipeSerializer(serializers.ModelSerializer):
                   'name',
                   'text',
                   'image',
+                  'image_variants',
                   'cooking_time',
                   'ingredients',
                   'tags',
                   'is_favorited',
                   'is_in_shopping_cart',)
 
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.context.get('personalize', True):
+            fields.pop('is_favorited')
+            fields.pop('is_in_shopping_cart')
+        return fields
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         return Favorite.objects.filter(
             user=self.context['request'].user.id, recipe=obj.id).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         return ShoppingList.objects.filter(
             user=self.context['request'].user.id, recipe=obj.id).exists()
 
 
 class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
-        source='ingredient')
+    id = serializers.IntegerField(source='ingredient_id')
 
     class Meta:
         model = RecipeIngredient
@@ -125,8 +227,7 @@ class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
 
 
 class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
-    tags = serializers.PrimaryKeyRelatedField(queryset=Tag.objects.all(),
-                                              many=True)
+    tags = serializers.ListField(child=serializers.IntegerField())
     ingredients = RecipeIngredientCreateSerializer(many=True)
     author = CustomUserSerializer(read_only=True)
     image = ImageField64()
@@ -144,17 +245,46 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             'cooking_time',
         )
 
+    def to_internal_value(self, data):
+        if isinstance(data, QueryDict):
+            data = self.parse_form(data)
+        return super().to_internal_value(data)
+
+    def parse_form(self, data):
+        parsed = data.dict()
+        for name in ('tags', 'ingredients'):
+            values = data.getlist(name)
+            if len(values) != 1:
+                if values:
+                    parsed[name] = values
+                continue
+            try:
+                value = json.loads(values[0])
+            except ValueError:
+                raise ValidationError({name: ['Ожидается JSON-список.']})
+            parsed[name] = value if isinstance(value, list) else [value]
+        return parsed
+
+    def resolve(self, model, ids):
+        objects = model.objects.in_bulk(ids)
+        missing = sorted(set(ids) - objects.keys())
+        if missing:
+            raise ValidationError(
+                f'Не найдены объекты с id: {", ".join(map(str, missing))}')
+        return objects
+
     def validate_ingredients(self, value):
         ingredients = value
         if not ingredients:
             raise ValidationError({
                 'Нужен хотя бы один ингредиент!'})
-        ingredients_list = []
+        ids = [item['ingredient_id'] for item in ingredients]
+        if len(set(ids)) != len(ids):
+            raise ValidationError({
+                'Ингридиенты не могут повторяться!'})
+        objects = self.resolve(Ingredient, ids)
         for item in ingredients:
-            if item in ingredients_list:
-                raise ValidationError({
-                    'Ингридиенты не могут повторяться!'})
-            ingredients_list.append(item)
+            item['ingredient'] = objects[item.pop('ingredient_id')]
         return value
 
     def validate_tags(self, value):
@@ -163,14 +293,12 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             raise ValidationError({
                 'Нужно выбрать хотя бы один тег!'
             })
-        tags_list = []
-        for tag in tags:
-            if tag in tags_list:
-                raise ValidationError({
-                    'Теги не могут повторяться!'
-                })
-            tags_list.append(tag)
-        return value
+        if len(set(tags)) != len(tags):
+            raise ValidationError({
+                'Теги не могут повторяться!'
+            })
+        objects = self.resolve(Tag, tags)
+        return [objects[tag] for tag in tags]
 
     def recipe_ingredients(self, recipe, ingredients):
         RecipeIngredient.objects.bulk_create(
@@ -180,43 +308,96 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
                 amount=ingredient.get('amount')
             ) for ingredient in ingredients)
 
+    def schedule_image(self, recipe, ready):
+        if not ready:
+            submit_job('process_image', user=recipe.author,
+                       recipe_id=recipe.id, name=recipe.image.name)
+
     @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
+        validated_data['image'], ready = store_original(
+            validated_data['image'])
         recipe = Recipe.objects.create(**validated_data)
+        self.schedule_image(recipe, ready)
         recipe.tags.set(tags)
         self.recipe_ingredients(
             recipe=recipe, ingredients=ingredients)
+        index_recipes([recipe.id])
         return recipe
 
+    def update_recipe_ingredients(self, recipe, ingredients):
+        existing = {
+            item.ingredient_id: item
+            for item in recipe.ingredient_recipeingredient.all()
+        }
+        amounts = {
+            ingredient['ingredient'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        created = [
+            RecipeIngredient(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount)
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in existing
+        ]
+        changed = []
+        for ingredient_id, amount in amounts.items():
+            item = existing.get(ingredient_id)
+            if item is not None and item.amount != amount:
+                item.amount = amount
+                changed.append(item)
+        removed = existing.keys() - amounts.keys()
+        if created:
+            RecipeIngredient.objects.bulk_create(created)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        if removed:
+            # Корзины и версию рецепта update() обновляет один раз на запрос.
+            delete_quietly(recipe.ingredient_recipeingredient.filter(
+                ingredient__in=removed))
+        return removed.union(
+            item.ingredient_id for item in created + changed)
+
     @transaction.atomic
     def update(self, instance, validated_data):
-        tags = validated_data.pop('tags')
-        ingredients = validated_data.pop('ingredients')
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        ready = True
+        if 'image' in validated_data:
+            validated_data['image'], ready = store_original(
+                validated_data['image'])
         instance = super().update(instance, validated_data)
-        instance.tags.clear()
-        instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.recipe_ingredients(
-            recipe=instance, ingredients=ingredients)
+        self.schedule_image(instance, ready)
+        if tags is not None:
+            instance.tags.set(tags)
+        if ingredients is not None:
+            ingredient_ids = self.update_recipe_ingredients(
+                instance, ingredients)
+            if ingredient_ids:
+                refresh_carts(
+                    instance.shopping_cart.values_list('user', flat=True),
+                    ingredient_ids)
+                index_recipes([instance.id])
         return instance
 
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
+        instance = Recipe.objects.with_user_flags(
+            request.user).with_related().get(pk=instance.pk)
         return RecipeSerializer(instance, context=context).data
 
 
 class SubscribeUserSerializer(CustomUserSerializer):
-    recipes_count = SerializerMethodField()
     recipes = SerializerMethodField()
 
     class Meta(CustomUserSerializer.Meta):
         fields = CustomUserSerializer.Meta.fields + (
             'recipes_count', 'recipes'
         )
-        read_only_fields = ('email', 'username')
+        read_only_fields = ('email', 'username', 'recipes_count')
 
     def validate(self, data):
         author = self.instance
@@ -233,9 +414,6 @@ class SubscribeUserSerializer(CustomUserSerializer):
             )
         return data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
     def get_recipes(self, obj):
         request = self.context.get('request')
         limit = request.GET.get('recipes_limit')
@@ -249,6 +427,7 @@ class SubscribeUserSerializer(CustomUserSerializer):
 
 class RecipeWithoutRequestSerializer(serializers.ModelSerializer):
     image = ImageField64()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -256,5 +435,37 @@ class RecipeWithoutRequestSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'image',
+            'image_variants',
             'cooking_time'
         )
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=settings.RECIPES_BATCH_LIMIT,
+    )
+
+
+class JobSerializer(serializers.ModelSerializer):
+    result_url = SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = (
+            'id',
+            'kind',
+            'status',
+            'result',
+            'error',
+            'created_at',
+            'finished_at',
+            'result_url',
+        )
+
+    def get_result_url(self, obj):
+        if obj.status != Job.DONE or not obj.file:
+            return None
+        return reverse('job-result', args=[obj.pk],
+                       request=self.context['request'])
@@ -0,0 +1,174 @@
+import io
+import threading
+import time
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.files import File
+from django.db import transaction
+from recipes.models import ShoppingCartIngredient
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+FONT_NAME = 'TimesNewRoman'
+FONT_PATH = settings.BASE_DIR / 'TimesNewRoman.ttf'
+FONT_SIZE = 14
+LEFT = 100
+TOP = 750
+BOTTOM = 50
+LINE_HEIGHT = 30
+SPOOL_SIZE = 1024 * 1024
+
+CART_VERSION_KEY = 'cart_version:{}'
+EXPORT_KEY = 'shopping_list:{}:{}:{}'
+STATS_KEY = 'shopping_list_cache:{}'
+
+
+def register_font():
+    if FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_PATH))
+
+
+def render_shopping_list(user, ingredients):
+    register_font()
+    buffer = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    shopping_list = canvas.Canvas(buffer, pagesize=A4)
+    shopping_list.setFont(FONT_NAME, FONT_SIZE)
+    shopping_list.drawString(
+        LEFT, TOP, f'{user.get_full_name()}, вот Ваш Cписок покупок:')
+    y = TOP - 50
+    for ingredient in ingredients:
+        if y < BOTTOM:
+            shopping_list.showPage()
+            shopping_list.setFont(FONT_NAME, FONT_SIZE)
+            y = TOP
+        shopping_list.drawString(
+            LEFT, y,
+            f'- {ingredient["ingredient__name"]} '
+            f'({ingredient["ingredient__measurement_unit"]})'
+            f' - {ingredient["amount"]}')
+        y -= LINE_HEIGHT
+    shopping_list.showPage()
+    shopping_list.save()
+    buffer.seek(0)
+    return buffer
+
+
+def get_cart_version(user_id):
+    return cache.get_or_set(
+        CART_VERSION_KEY.format(user_id), time.time_ns, None)
+
+
+def bump_cart_versions(user_ids):
+    version = time.time_ns()
+    cache.set_many({
+        CART_VERSION_KEY.format(user_id): version for user_id in user_ids
+    }, None)
+
+
+class CartRefresh:
+    """Пересчитывает агрегат корзин указанных пользователей."""
+
+    def __init__(self):
+        self.carts = {}
+
+    def add(self, user_ids, ingredient_ids=None):
+        for user_id in user_ids:
+            if ingredient_ids is None:
+                self.carts[user_id] = None
+            elif self.carts.get(user_id, set()) is not None:
+                self.carts.setdefault(user_id, set()).update(ingredient_ids)
+
+    def __call__(self):
+        full = [user_id for user_id, ids in self.carts.items() if ids is None]
+        partial = {user_id: ids for user_id, ids in self.carts.items() if ids}
+        with transaction.atomic():
+            ShoppingCartIngredient.objects.refresh(full)
+            ShoppingCartIngredient.objects.refresh(
+                partial, set().union(*partial.values()))
+        bump_cart_versions(self.carts)
+
+
+pending_refresh = threading.local()
+
+
+def flush_cart_refresh():
+    refresh = getattr(pending_refresh, 'carts', None)
+    pending_refresh.carts = None
+    if refresh is not None:
+        refresh()
+
+
+def refresh_carts(user_ids, ingredient_ids=None):
+    """Пересчитывает корзины после коммита, один раз на транзакцию.
+
+    Каждый вызов регистрирует flush_cart_refresh; первый из них забирает
+    накопленное, остальные ничего не делают. После отката накопленное
+    переходит в следующую транзакцию — пересчёт идёт по живым данным,
+    так что лишний пересчёт безвреден.
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    refresh = getattr(pending_refresh, 'carts', None)
+    if refresh is None:
+        refresh = pending_refresh.carts = CartRefresh()
+    refresh.add(user_ids, ingredient_ids)
+    transaction.on_commit(flush_cart_refresh)
+
+
+def count(event):
+    key = STATS_KEY.format(event)
+    cache.add(key, 0, None)
+    cache.incr(key)
+
+
+def get_cache_stats():
+    stats = cache.get_many([STATS_KEY.format('hits'),
+                            STATS_KEY.format('misses')])
+    return {
+        'hits': stats.get(STATS_KEY.format('hits'), 0),
+        'misses': stats.get(STATS_KEY.format('misses'), 0),
+    }
+
+
+def cached_shopping_list(user_id, version, format='pdf'):
+    """Готовый список покупок из кэша выгрузок или None."""
+    content = caches['exports'].get(
+        EXPORT_KEY.format(user_id, version, format))
+    if content is None:
+        count('misses')
+        return None
+    count('hits')
+    return io.BytesIO(content)
+
+
+def cache_shopping_list(user_id, version, file, format='pdf'):
+    """Кладёт файл, собранный задачей, в кэш выгрузок, если он невелик.
+
+    Возвращает открытый файл для ответа.
+    """
+    file.open('rb')
+    if file.size > settings.SHOPPING_LIST_CACHE_MAX_SIZE:
+        return file
+    with file:
+        content = file.read()
+    caches['exports'].set(
+        EXPORT_KEY.format(user_id, version, format), content)
+    return io.BytesIO(content)
+
+
+def export_shopping_list(job):
+    ingredients = list(job.user.shopping_cart_ingredients.values(
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        'amount',
+    ))
+    if not ingredients:
+        raise ValueError('Список покупок пуст.')
+    buffer = render_shopping_list(job.user, ingredients)
+    job.file.save(f'shopping_list_{job.pk}.pdf', File(buffer), save=False)
+    return {'size': job.file.size}
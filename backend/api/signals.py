@@ -0,0 +1,149 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+from recipes.counters import change_counter
+from recipes.feed import push_recipe, update_feed_mode
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingList, Tag)
+from rest_framework.authtoken.models import Token
+from users.models import Follow
+
+from .authentication import invalidate_token, invalidate_user_tokens
+from .catalog import bump_catalog_version
+from .response_cache import bump_recipe_versions
+from .shopping_list import bump_cart_versions, refresh_carts
+
+User = get_user_model()
+
+
+def bump_carts(carts):
+    user_ids = set(carts.values_list('user_id', flat=True))
+    if user_ids:
+        transaction.on_commit(lambda: bump_cart_versions(user_ids))
+
+
+def bump_recipes(recipe_ids):
+    recipe_ids = set(recipe_ids)
+    transaction.on_commit(lambda: bump_recipe_versions(recipe_ids))
+
+
+def touch_recipes(recipe_ids):
+    Recipe.objects.filter(pk__in=recipe_ids).update(updated_at=timezone.now())
+    bump_recipes(recipe_ids)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_changed(instance, raw=False, **kwargs):
+    transaction.on_commit(bump_catalog_version)
+    if not raw:
+        bump_carts(ShoppingList.objects.filter(recipe__ingredients=instance))
+        bump_recipes(instance.recipes.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def tag_changed(instance, raw=False, **kwargs):
+    transaction.on_commit(bump_catalog_version)
+    if not raw:
+        bump_recipes(instance.recipes.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=User)
+def user_changed(instance, created, raw=False, update_fields=None,
+                 **kwargs):
+    if created or raw or update_fields == frozenset({'last_login'}):
+        return
+    touch_recipes(list(instance.recipes.values_list('id', flat=True)))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_saved(instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_changed(instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    bump_recipes([instance.pk])
+    if created:
+        push_recipe(instance)
+    else:
+        bump_carts(ShoppingList.objects.filter(recipe=instance))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        touch_recipes([instance.pk])
+    elif pk_set:
+        touch_recipes(pk_set)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(instance, **kwargs):
+    bump_recipes([instance.pk])
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_changed(instance, created=True, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_carts(
+        ShoppingList.objects.filter(
+            recipe_id=instance.recipe_id).values_list('user_id', flat=True),
+        [instance.ingredient_id] if created else None)
+    touch_recipes([instance.recipe_id])
+
+
+@receiver(pre_save, sender=ShoppingList)
+def shopping_list_saving(instance, raw=False, **kwargs):
+    if not raw and instance.pk is not None:
+        instance.previous_user_id = ShoppingList.objects.filter(
+            pk=instance.pk).values_list('user_id', flat=True).first()
+
+
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_delete, sender=ShoppingList)
+def shopping_list_changed(instance, raw=False, **kwargs):
+    if not raw:
+        refresh_carts({instance.user_id, getattr(
+            instance, 'previous_user_id', None)} - {None})
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_changed(instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: update_feed_mode(instance.author_id))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_save, sender=Follow)
+@receiver(post_save, sender=Recipe)
+def counted_created(instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_counter(instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingList)
+@receiver(post_delete, sender=Follow)
+@receiver(post_delete, sender=Recipe)
+def counted_deleted(instance, **kwargs):
+    change_counter(instance, -1)
@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ..authentication import local_tokens
+
+User = get_user_model()
+
+PNG = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAAC'
+    'VBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNoAAAA'
+    'ggCByxOyYQAAAABJRU5ErkJggg=='
+)
+
+
+class RecipesTestCase(TestCase):
+    recipes_count = 10
+    ingredients_count = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                username=f'user{i}', email=f'user{i}@example.com',
+                password='password', first_name='Имя', last_name='Фамилия')
+            for i in range(3)
+        ]
+        cls.tags = [
+            Tag.objects.create(name=f'tag{i}', color=f'#00000{i}',
+                               slug=f'tag{i}')
+            for i in range(3)
+        ]
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'ingredient{i}', measurement_unit='г')
+            for i in range(cls.ingredients_count)
+        )
+        cls.ingredients = list(Ingredient.objects.order_by('id'))
+        cls.recipes = [
+            cls.create_recipe(cls.users[i % 3], i)
+            for i in range(cls.recipes_count)
+        ]
+
+    @classmethod
+    def create_recipe(cls, author, number):
+        recipe = Recipe.objects.create(
+            author=author, name=f'recipe{number}', text='text',
+            image='recipes/images/recipe.png', cooking_time=5)
+        recipe.tags.set([cls.tags[number % 3]])
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                             amount=10 + k)
+            for k, ingredient in enumerate(
+                cls.ingredients[number % 7:number % 7 + 3])
+        )
+        return recipe
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        local_tokens.entries.clear()
+
+    def client_for(self, user=None):
+        client = APIClient()
+        if user is not None:
+            token, _ = Token.objects.get_or_create(user=user)
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
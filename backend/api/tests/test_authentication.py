@@ -0,0 +1,74 @@
+import tempfile
+
+from django.test import override_settings
+
+from ..authentication import local_tokens
+from .base import RecipesTestCase
+
+ME = '/api/users/me/'
+
+
+class CachedTokenAuthenticationTest(RecipesTestCase):
+    """Тёплый кэш токенов избавляет от запроса аутентификации."""
+
+    recipes_count = 0
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.users[0]
+        self.client = self.client_for(self.user)
+
+    def test_warm_read_skips_auth_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(ME).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(ME).status_code, 200)
+
+    def test_user_save_invalidates(self):
+        self.client.get(ME)
+        self.user.first_name = 'Новое'
+        self.user.save()
+        with self.assertNumQueries(1):
+            data = self.client.get(ME).json()
+        self.assertEqual(data['first_name'], 'Новое')
+
+    def test_logout_invalidates(self):
+        self.client.get(ME)
+        self.assertEqual(
+            self.client.post('/api/auth/token/logout/').status_code, 204)
+        self.assertEqual(self.client.get(ME).status_code, 401)
+
+    def test_deactivation_invalidates(self):
+        self.client.get(ME)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(ME).status_code, 401)
+
+
+class SharedTokenCacheTest(CachedTokenAuthenticationTest):
+    """Второй уровень работает только с общим для процессов кэшем."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        caches = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': directory.name,
+        }, 'responses': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }})
+        caches.enable()
+        self.addCleanup(caches.disable)
+        super().setUp()
+
+    def test_other_process_reads_shared_entry(self):
+        self.client.get(ME)
+        local_tokens.entries.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(ME).status_code, 200)
+
+    def test_logout_reaches_shared_entry(self):
+        self.client.get(ME)
+        self.client.post('/api/auth/token/logout/')
+        local_tokens.entries.clear()
+        self.assertEqual(self.client.get(ME).status_code, 401)
@@ -0,0 +1,49 @@
+from django.test import override_settings
+from recipes.feed import feed_positions
+from recipes.jobs import claim_jobs, run_job
+from recipes.models import FeedEntry, PulledAuthor, Recipe
+
+from .base import RecipesTestCase
+
+
+@override_settings(FEED_FANOUT_LIMIT=1, FEED_FANOUT_RESUME=1)
+class FeedModeTest(RecipesTestCase):
+    """Лента не теряет рецепты при переходе автора через порог раскладки."""
+
+    def subscribe(self, user, method='post'):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client_for(user), method)(
+                f'/api/users/{self.author.id}/subscribe/')
+        self.assertIn(response.status_code, (201, 204))
+        for job in claim_jobs(10):
+            run_job(job)
+
+    def assert_feed_is_complete(self, user):
+        expected = list(Recipe.objects.filter(
+            author=self.author).order_by('-pub_date', '-id').values_list(
+            'pub_date', 'id')[:6])
+        self.assertEqual(feed_positions(user, None, 6), expected)
+
+    def setUp(self):
+        super().setUp()
+        self.author, self.reader, self.other = self.users
+
+    def test_author_crosses_threshold_both_ways(self):
+        self.subscribe(self.reader)
+        self.assertFalse(PulledAuthor.objects.exists())
+        self.assert_feed_is_complete(self.reader)
+
+        self.subscribe(self.other)
+        self.assertTrue(PulledAuthor.objects.filter(
+            author=self.author, backfilling=False).exists())
+        self.assertFalse(FeedEntry.objects.filter(
+            recipe__author=self.author).exists())
+        self.create_recipe(self.author, 100)
+        self.assert_feed_is_complete(self.reader)
+
+        self.subscribe(self.other, 'delete')
+        self.assertFalse(PulledAuthor.objects.exists())
+        self.assert_feed_is_complete(self.reader)
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(),
+            self.author.recipes.count())
@@ -0,0 +1,47 @@
+import base64
+import textwrap
+
+from django.test import SimpleTestCase, override_settings
+from rest_framework.exceptions import ValidationError
+
+from ..serializers import ImageField64
+from .base import PNG
+
+HEADER, ENCODED = PNG.split(',', 1)
+RAW = base64.b64decode(ENCODED)
+
+
+class ImageField64DecodeTest(SimpleTestCase):
+    """Декодирование base64 по кускам совпадает с обычным b64decode."""
+
+    def decode(self, encoded, chunk_size=8):
+        field = ImageField64()
+        field.chunk_size = chunk_size
+        upload = field.decode(f'{HEADER},{encoded}')
+        try:
+            return upload.read()
+        finally:
+            upload.close()
+
+    def test_plain(self):
+        self.assertEqual(self.decode(ENCODED), RAW)
+        self.assertEqual(self.decode(ENCODED, chunk_size=64 * 1024), RAW)
+
+    def test_whitespace_is_ignored(self):
+        wrapped = '\r\n'.join(textwrap.wrap(ENCODED, 76))
+        for chunk_size in (5, 8, 13, 64 * 1024):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(self.decode(wrapped, chunk_size), RAW)
+        self.assertEqual(self.decode(' '.join(ENCODED) + '\n'), RAW)
+
+    def test_invalid_characters_are_rejected(self):
+        for encoded in (ENCODED[:10] + '!' + ENCODED[10:], ENCODED[:-1]):
+            with self.subTest(encoded=encoded):
+                with self.assertRaises(ValidationError):
+                    self.decode(encoded)
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=len(RAW) - 1)
+    def test_max_size(self):
+        with self.assertRaises(ValidationError) as error:
+            self.decode(ENCODED)
+        self.assertEqual(error.exception.detail[0].code, 'max_size')
@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from recipes.jobs import claim_jobs, requeue_stale_jobs
+from recipes.models import Job
+
+
+@override_settings(JOBS_STALE_AFTER=60, JOBS_MAX_ATTEMPTS=3)
+class RequeueStaleJobsTest(TestCase):
+    """Зависшие задачи перезапускаются не больше JOBS_MAX_ATTEMPTS раз."""
+
+    def create_job(self, attempts, started_ago):
+        return Job.objects.create(
+            kind='shopping_list', status=Job.RUNNING, attempts=attempts,
+            started_at=timezone.now() - timedelta(seconds=started_ago))
+
+    def test_requeue_and_fail(self):
+        retried = self.create_job(attempts=2, started_ago=120)
+        exhausted = self.create_job(attempts=3, started_ago=120)
+        running = self.create_job(attempts=3, started_ago=10)
+        self.assertEqual(requeue_stale_jobs(), 1)
+        for job in (retried, exhausted, running):
+            job.refresh_from_db()
+        self.assertEqual(retried.status, Job.PENDING)
+        self.assertEqual(exhausted.status, Job.FAILED)
+        self.assertTrue(exhausted.error)
+        self.assertIsNotNone(exhausted.finished_at)
+        self.assertEqual(running.status, Job.RUNNING)
+
+    def test_attempts_are_counted_per_claim(self):
+        job = Job.objects.create(kind='shopping_list')
+        for attempt in range(1, 4):
+            self.assertEqual([claimed.pk for claimed in claim_jobs(1)],
+                             [job.pk])
+            Job.objects.filter(pk=job.pk).update(
+                started_at=timezone.now() - timedelta(seconds=120))
+            requeue_stale_jobs()
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, attempt)
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(claim_jobs(1), [])
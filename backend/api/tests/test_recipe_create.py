@@ -0,0 +1,59 @@
+import math
+import shutil
+import tempfile
+
+from django.db import connection
+from django.test import override_settings
+from recipes.models import Recipe, RecipeIngredient
+
+from .base import PNG, RecipesTestCase
+
+# Запросы создания без вставки ингредиентов: та идёт одним INSERT на пачку.
+CREATE_QUERIES = 22
+
+
+class RecipeCreateQueriesTest(RecipesTestCase):
+    """Число запросов при создании рецепта не зависит от числа ингредиентов."""
+
+    recipes_count = 0
+    ingredients_count = 500
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.client = self.client_for(self.users[0])
+        self.client.get('/api/users/me/')
+
+    def create_recipe_with(self, count):
+        payload = {
+            'name': f'recipe {count}',
+            'text': 'text',
+            'cooking_time': 5,
+            'image': PNG,
+            'tags': [tag.id for tag in self.tags],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 1}
+                for ingredient in self.ingredients[:count]
+            ],
+        }
+        # SQLite режет вставку по лимиту параметров, PostgreSQL — нет.
+        fields = [field for field in RecipeIngredient._meta.concrete_fields
+                  if not field.primary_key]
+        batches = math.ceil(
+            count / connection.ops.bulk_batch_size(fields, [None] * count))
+        with self.assertNumQueries(CREATE_QUERIES + batches):
+            response = self.client.post(
+                '/api/recipes/', payload, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        recipe = Recipe.objects.get(pk=response.data['id'])
+        self.assertEqual(recipe.ingredient_recipeingredient.count(), count)
+
+    def test_create_with_5_ingredients(self):
+        self.create_recipe_with(5)
+
+    def test_create_with_500_ingredients(self):
+        self.create_recipe_with(500)
@@ -0,0 +1,33 @@
+from .base import RecipesTestCase
+
+
+class RecipeQueriesTest(RecipesTestCase):
+    """Число запросов не зависит от размера страницы."""
+
+    recipes_count = 12
+
+    def assert_list_queries(self, client, expected):
+        client.get('/api/recipes/?limit=1')
+        for limit in (3, 12):
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(expected):
+                    response = client.get(f'/api/recipes/?limit={limit}')
+                self.assertEqual(len(response.json()['results']), limit)
+
+    def assert_detail_queries(self, client, expected):
+        client.get(f'/api/recipes/{self.recipes[1].id}/')
+        with self.assertNumQueries(expected):
+            response = client.get(f'/api/recipes/{self.recipes[0].id}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_anonymous(self):
+        self.assert_list_queries(self.client_for(), 5)
+
+    def test_list_authenticated(self):
+        self.assert_list_queries(self.client_for(self.users[0]), 5)
+
+    def test_detail_anonymous(self):
+        self.assert_detail_queries(self.client_for(), 4)
+
+    def test_detail_authenticated(self):
+        self.assert_detail_queries(self.client_for(self.users[0]), 4)
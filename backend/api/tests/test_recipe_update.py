@@ -0,0 +1,102 @@
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes.models import (RecipeIngredient, ShoppingCartIngredient,
+                            ShoppingList)
+
+from .base import RecipesTestCase
+
+THROUGH_WRITE = re.compile(
+    r'^\s*(INSERT|UPDATE|DELETE).*"recipes_recipe(ingredient|_tags)"',
+    re.IGNORECASE)
+
+
+class RecipeUpdateTest(RecipesTestCase):
+    """Неизменённые ингредиенты и теги не переписываются."""
+
+    def test_unchanged_patch_skips_through_tables(self):
+        recipe = self.recipes[0]
+        payload = {
+            'name': 'new name',
+            'tags': [tag.id for tag in recipe.tags.all()],
+            'ingredients': [
+                {'id': item.ingredient_id, 'amount': item.amount}
+                for item in recipe.ingredient_recipeingredient.all()
+            ],
+        }
+        client = self.client_for(recipe.author)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.patch(
+                f'/api/recipes/{recipe.id}/', payload, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            [query['sql'] for query in queries.captured_queries
+             if THROUGH_WRITE.match(query['sql'])], [])
+
+    def test_changed_amount_updates_only_that_row(self):
+        recipe = self.recipes[0]
+        items = list(recipe.ingredient_recipeingredient.order_by('id'))
+        payload = {'ingredients': [
+            {'id': item.ingredient_id, 'amount': item.amount + (i == 0)}
+            for i, item in enumerate(items)
+        ]}
+        client = self.client_for(recipe.author)
+        with CaptureQueriesContext(connection) as queries:
+            client.patch(f'/api/recipes/{recipe.id}/', payload, format='json')
+        writes = [query['sql'] for query in queries.captured_queries
+                  if THROUGH_WRITE.match(query['sql'])]
+        self.assertEqual(len(writes), 1)
+        self.assertTrue(writes[0].startswith('UPDATE'))
+        items[0].refresh_from_db()
+        self.assertEqual(items[0].amount, 11)
+
+
+class RecipeIngredientRemovalTest(RecipesTestCase):
+    """Удаление ингредиентов не зависит от их числа по запросам."""
+
+    ingredients_count = 16
+
+    def create_full_recipe(self):
+        recipe = self.create_recipe(self.users[0], 0)
+        recipe.ingredient_recipeingredient.all().delete()
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+            for ingredient in self.ingredients
+        )
+        ShoppingList.objects.create(user=self.users[1], recipe=recipe)
+        return recipe
+
+    def remove_ingredients(self, removed):
+        recipe = self.create_full_recipe()
+        kept = self.ingredients[removed:]
+        payload = {'ingredients': [
+            {'id': ingredient.id, 'amount': 10} for ingredient in kept]}
+        client = self.client_for(recipe.author)
+        client.get('/api/users/me/')
+        with CaptureQueriesContext(connection) as queries:
+            response = client.patch(
+                f'/api/recipes/{recipe.id}/', payload, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            set(recipe.ingredient_recipeingredient.values_list(
+                'ingredient_id', flat=True)),
+            {ingredient.id for ingredient in kept})
+        return len(queries)
+
+    def test_removal_query_count_is_constant(self):
+        counts = [self.remove_ingredients(removed) for removed in (1, 5, 15)]
+        self.assertEqual(len(set(counts)), 1, counts)
+
+    def test_removal_refreshes_cart(self):
+        recipe = self.create_full_recipe()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client_for(recipe.author).patch(
+                f'/api/recipes/{recipe.id}/',
+                {'ingredients': [{'id': self.ingredients[0].id,
+                                  'amount': 10}]},
+                format='json')
+        self.assertEqual(
+            list(ShoppingCartIngredient.objects.filter(
+                user=self.users[1]).values_list('ingredient_id', flat=True)),
+            [self.ingredients[0].id])
@@ -0,0 +1,112 @@
+import tempfile
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Favorite, Recipe
+
+from .base import RecipesTestCase
+
+
+class DetailCacheTest(RecipesTestCase):
+    """Анонимный ответ и ответ с personalize=false кэшируются раздельно."""
+
+    def setUp(self):
+        super().setUp()
+        self.url = f'/api/recipes/{self.recipes[0].id}/'
+        Favorite.objects.create(user=self.users[1], recipe=self.recipes[0])
+
+    def test_anonymous_then_unpersonalized(self):
+        self.client_for().get(self.url)
+        data = self.client_for(self.users[1]).get(
+            self.url, {'personalize': 'false'}).json()
+        self.assertNotIn('is_favorited', data)
+        self.assertNotIn('is_in_shopping_cart', data)
+
+    def test_unpersonalized_then_anonymous(self):
+        self.client_for(self.users[1]).get(
+            self.url, {'personalize': 'false'})
+        data = self.client_for().get(self.url).json()
+        self.assertIs(data['is_favorited'], False)
+        self.assertIs(data['is_in_shopping_cart'], False)
+
+
+class ValidatorsTest(RecipesTestCase):
+    """ETag зависит от параметров запроса, а не только от состояния данных."""
+
+    def assert_etag_differs(self, url, first, second):
+        client = self.client_for()
+        etag = client.get(url, first)['ETag']
+        self.assertEqual(
+            client.get(url, first, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        response = client.get(url, second, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_pages(self):
+        self.assert_etag_differs(
+            '/api/recipes/', {'limit': 3}, {'limit': 3, 'page': 2})
+
+    def test_detail_invalid_pk(self):
+        client = self.client_for()
+        for params in ({}, {'personalize': 'false'}):
+            with self.subTest(params=params):
+                self.assertEqual(
+                    client.get('/api/recipes/abc/', params).status_code, 404)
+
+    def test_detail_personalize(self):
+        self.assert_etag_differs(
+            f'/api/recipes/{self.recipes[0].id}/', {},
+            {'personalize': 'false'})
+
+
+class FileBasedResponseCacheTest(RecipesTestCase):
+    """Кэш ответов на файловом бэкенде: попадание и инвалидация."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        caches = override_settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+            'responses': {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': directory.name,
+            },
+        })
+        caches.enable()
+        self.addCleanup(caches.disable)
+        super().setUp()
+        self.client = self.client_for()
+
+    def assert_cached(self, url):
+        with CaptureQueriesContext(connection) as miss:
+            first = self.client.get(url).json()
+        with CaptureQueriesContext(connection) as hit:
+            second = self.client.get(url).json()
+        self.assertEqual(first, second)
+        self.assertLess(len(hit), len(miss))
+        return first
+
+    def test_list_hit_and_invalidation(self):
+        url = '/api/recipes/?limit=3'
+        data = self.assert_cached(url)
+        recipe = Recipe.objects.get(pk=data['results'][0]['id'])
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.name = 'renamed'
+            recipe.save()
+        self.assertEqual(
+            self.client.get(url).json()['results'][0]['name'], 'renamed')
+
+    def test_detail_hit_and_invalidation(self):
+        recipe = self.recipes[0]
+        url = f'/api/recipes/{recipe.id}/'
+        self.assert_cached(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.ingredient_recipeingredient.update(amount=77)
+            recipe.ingredient_recipeingredient.first().save()
+        self.assertEqual(
+            {item['amount'] for item
+             in self.client.get(url).json()['ingredients']}, {77})
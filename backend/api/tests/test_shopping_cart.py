@@ -0,0 +1,123 @@
+from django.db import DatabaseError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from recipes.models import (Favorite, Recipe, RecipeIngredient,
+                            ShoppingCartIngredient, ShoppingList)
+
+from .base import RecipesTestCase
+
+
+class ShoppingCartAggregateTest(RecipesTestCase):
+    """Агрегат корзины совпадает с живыми данными после любых правок."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.users[0]
+        self.client = self.client_for(self.user)
+
+    def assert_aggregate_is_live(self):
+        self.assertEqual(
+            dict(ShoppingCartIngredient.objects.filter(
+                user=self.user).values_list('ingredient', 'amount')),
+            {ingredient: amount for (_, ingredient), amount
+             in ShoppingCartIngredient.objects.live_totals(
+                 [self.user.id]).items()})
+
+    def test_api_add_and_remove(self):
+        recipe_ids = [recipe.id for recipe in self.recipes[:3]]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/recipes/shopping_cart/',
+                             {'recipes': recipe_ids}, format='json')
+        self.assert_aggregate_is_live()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete('/api/recipes/shopping_cart/',
+                               {'recipes': recipe_ids[:2]}, format='json')
+        self.assert_aggregate_is_live()
+
+    def test_recipe_ingredient_edits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ShoppingList.objects.create(user=self.user, recipe=self.recipes[0])
+        item = self.recipes[0].ingredient_recipeingredient.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            item.ingredient = self.ingredients[-1]
+            item.amount = 99
+            item.save()
+        self.assert_aggregate_is_live()
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.create(
+                recipe=self.recipes[0], ingredient=self.ingredients[-2],
+                amount=7)
+            item.delete()
+        self.assert_aggregate_is_live()
+
+    def test_shopping_list_edits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            entry = ShoppingList.objects.create(
+                user=self.user, recipe=self.recipes[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            entry.recipe = self.recipes[4]
+            entry.save()
+        self.assert_aggregate_is_live()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes[4].delete()
+        self.assert_aggregate_is_live()
+        self.assertFalse(ShoppingCartIngredient.objects.filter(
+            user=self.user).exists())
+
+    def test_refresh_after_rolled_back_transaction(self):
+        entry = ShoppingList.objects.create(
+            user=self.user, recipe=self.recipes[0])
+        try:
+            with transaction.atomic():
+                entry.delete()
+                raise DatabaseError
+        except DatabaseError:
+            pass
+        with self.captureOnCommitCallbacks(execute=True):
+            ShoppingList.objects.create(
+                user=self.user, recipe=self.recipes[1])
+        self.assert_aggregate_is_live()
+        self.assertTrue(ShoppingCartIngredient.objects.filter(
+            user=self.user).exists())
+
+
+class BatchQueriesTest(RecipesTestCase):
+    """Пакетные добавление и удаление не зависят от числа рецептов."""
+
+    recipes_count = 20
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.users[0]
+        self.client = self.client_for(self.user)
+        self.client.get('/api/users/me/')
+
+    def count_queries(self, method, url, recipes):
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = getattr(self.client, method)(
+                    url, {'recipes': [recipe.id for recipe in recipes]},
+                    format='json')
+        self.assertLess(response.status_code, 300, response.content)
+        return len(queries)
+
+    def assert_batch_is_flat(self, model, url, counter):
+        counts = {}
+        for size in (3, 20):
+            recipes = self.recipes[:size]
+            counts[size] = (
+                self.count_queries('post', url, recipes),
+                self.count_queries('delete', url, recipes))
+            self.assertFalse(model.objects.filter(user=self.user).exists())
+            self.assertFalse(Recipe.objects.filter(
+                **{f'{counter}__gt': 0}).exists())
+        self.assertEqual(counts[3], counts[20], counts)
+
+    def test_favorite(self):
+        self.assert_batch_is_flat(
+            Favorite, '/api/recipes/favorite/', 'favorites_count')
+
+    def test_shopping_cart(self):
+        self.assert_batch_is_flat(
+            ShoppingList, '/api/recipes/shopping_cart/', 'in_carts_count')
+        self.assertFalse(ShoppingCartIngredient.objects.filter(
+            user=self.user).exists())
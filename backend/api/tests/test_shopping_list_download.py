@@ -0,0 +1,68 @@
+import shutil
+import tempfile
+
+from django.test import override_settings
+from recipes.jobs import claim_jobs, run_job
+from recipes.models import Job, ShoppingList
+
+from .base import RecipesTestCase
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class ShoppingListDownloadTest(RecipesTestCase):
+    """Список покупок собирает задача, а не запрос скачивания."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root, JOBS_EAGER=False)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.user = self.users[0]
+        self.client = self.client_for(self.user)
+
+    def fill_cart(self, recipe):
+        with self.captureOnCommitCallbacks(execute=True):
+            ShoppingList.objects.create(user=self.user, recipe=recipe)
+
+    def run_jobs(self):
+        for job in claim_jobs(10):
+            run_job(job)
+
+    def test_empty_cart(self):
+        self.assertEqual(self.client.get(URL).status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+    def test_miss_submits_job_and_hit_serves_file(self):
+        self.fill_cart(self.recipes[0])
+        response = self.client.get(URL)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], Job.PENDING)
+        self.assertTrue(response['Location'].endswith(
+            f'/api/jobs/{response.data["id"]}/'))
+        self.assertEqual(self.client.get(URL).data['id'], response.data['id'])
+        self.assertEqual(Job.objects.count(), 1)
+
+        self.run_jobs()
+        response = self.client.get(URL)
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'%PDF'))
+        etag = response['ETag']
+        self.assertEqual(
+            self.client.get(URL, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.assertNumQueries(0):
+            response = self.client.get(URL)
+        self.assertEqual(b''.join(response.streaming_content), content)
+
+    def test_cart_change_needs_new_job(self):
+        self.fill_cart(self.recipes[0])
+        self.client.get(URL)
+        self.run_jobs()
+        self.assertEqual(self.client.get(URL).status_code, 200)
+        self.fill_cart(self.recipes[1])
+        response = self.client.get(URL)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(Job.objects.count(), 2)
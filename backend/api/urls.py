@@ -1,14 +1,17 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 from users.views import CustomUserView
-from api.views import IngredientsViewSet, RecipeViewSet, TagViewSet
+from api.views import (CatalogView, IngredientsViewSet, JobViewSet,
+                       RecipeViewSet, TagViewSet)
 
 router = DefaultRouter()
 router.register(r'users', CustomUserView)
 router.register(r'ingredients', IngredientsViewSet)
 router.register(r'recipes', RecipeViewSet)
 router.register(r'tags', TagViewSet)
+router.register(r'jobs', JobViewSet, basename='job')
 urlpatterns = [
+    path('catalog/', CatalogView.as_view()),
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
 ]
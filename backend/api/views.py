@@ -1,39 +1,76 @@
-import io
-
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import FileResponse
-from django.shortcuts import get_object_or_404
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseRedirect)
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django_filters.rest_framework import DjangoFilterBackend
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingList, Tag)
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
+from recipes.counters import update_counters
+from recipes.feed import feed_positions
+from recipes.similarity import similar_recipes
+from recipes.jobs import submit_job
+from recipes.models import (Favorite, Ingredient, Job, Recipe,
+                            ShoppingCartIngredient, ShoppingList, Tag,
+                            delete_quietly)
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny, SAFE_METHODS, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.permissions import (AllowAny, SAFE_METHODS, IsAdminUser,
+                                        IsAuthenticated)
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.views import APIView
 
-from .filters import IngredientFilterSet, RecipeFilterSet
-from .paginations import LimitPagination
+from .catalog import catalog_etag, catalog_last_modified, get_catalog_version
+from .filters import RecipeFilterSet
+from .paginations import (ApproximateCountPagination, CursorPaginationMixin,
+                          FeedPagination, RecipeCursorPagination)
 from .permissions import IsAuthorOrReadOnly
+from .response_cache import (cache_response, conditional_response,
+                             detail_key, detail_validators, list_key,
+                             list_validators)
+from .search import ingredient_index
 from .serializers import (
-    IngredientSerializer, RecipeCreateUpdateSerializer, RecipeSerializer,
-    TagSerializer, RecipeWithoutRequestSerializer)
+    IngredientSerializer, JobSerializer, RecipeCreateUpdateSerializer,
+    RecipeIdsSerializer, RecipeSerializer, TagSerializer,
+    RecipeWithoutRequestSerializer)
+from .shopping_list import (bump_cart_versions, cache_shopping_list,
+                            cached_shopping_list, get_cache_stats,
+                            get_cart_version, refresh_carts)
 
 User = get_user_model()
 
+CATALOG_KEY = 'catalog:{}'
+catalog_condition = method_decorator(
+    condition(
+        etag_func=catalog_etag, last_modified_func=catalog_last_modified),
+    name='dispatch',
+)
+
 
+@catalog_condition
 class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny,)
-    filter_backends = [DjangoFilterBackend]
-    filterset_class = IngredientFilterSet
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        search = request.query_params.get('search')
+        name = request.query_params.get('name')
+        if search:
+            content = ingredient_index.search(search)
+        elif name:
+            content = ingredient_index.startswith(name)
+        else:
+            content = ingredient_index.all()
+        return HttpResponse(content, content_type='application/json')
+
 
+@catalog_condition
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
@@ -41,13 +78,69 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class CatalogView(APIView):
+    permission_classes = (AllowAny,)
+    authentication_classes = ()
+
+    def get(self, request):
+        version = str(get_catalog_version())
+        if request.query_params.get('v') != version:
+            response = HttpResponseRedirect(f'{request.path}?v={version}')
+            patch_cache_control(response, no_cache=True)
+            return response
+        content = cache.get(CATALOG_KEY.format(version))
+        if content is None:
+            content = (
+                b'{"version":' + version.encode()
+                + b',"tags":' + JSONRenderer().render(TagSerializer(
+                    Tag.objects.all(), many=True).data)
+                + b',"ingredients":' + ingredient_index.all() + b'}'
+            )
+            cache.set(CATALOG_KEY.format(version), content, None)
+        response = HttpResponse(content, content_type='application/json')
+        patch_cache_control(
+            response, public=True, max_age=60 * 60 * 24 * 365, immutable=True)
+        return response
+
+
+class RecipeViewSet(CursorPaginationMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthorOrReadOnly,)
-    pagination_class = LimitPagination
+    pagination_class = ApproximateCountPagination
+    cursor_pagination_class = RecipeCursorPagination
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilterSet
 
+    def personalize(self):
+        return self.request.query_params.get('personalize') != 'false'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+        if not self.personalize():
+            return queryset.select_related('author').with_related()
+        return queryset.with_user_flags(self.request.user).with_related()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['personalize'] = self.personalize()
+        return context
+
+    def use_cursor_pagination(self):
+        return (self.action not in ('popular', 'trending')
+                and super().use_cursor_pagination())
+
+    @conditional_response(list_validators)
+    @cache_response(list_key)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_response(detail_validators)
+    @cache_response(detail_key)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -56,14 +149,54 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeSerializer
         return RecipeCreateUpdateSerializer
 
+    @action(detail=False)
+    def popular(self, request):
+        return self.ranked('-ranking__popular_score')
+
+    @action(detail=False)
+    def trending(self, request):
+        return self.ranked('-ranking__trending_score')
+
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        paginator = FeedPagination()
+        positions = paginator.paginate_positions(
+            request, lambda position, limit: feed_positions(
+                request.user, position, limit))
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for _, recipe_id in positions])
+        serializer = self.get_serializer([
+            recipes[recipe_id] for _, recipe_id in positions
+            if recipe_id in recipes
+        ], many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True)
+    def similar(self, request, pk):
+        recipe = self.get_object()
+        recipe_ids = similar_recipes(recipe.id, (
+            item.ingredient_id
+            for item in recipe.ingredient_recipeingredient.all()))
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        serializer = self.get_serializer(
+            [recipes[recipe_id] for recipe_id in recipe_ids], many=True)
+        return Response(serializer.data)
+
+    def ranked(self, ordering):
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            ranking__isnull=False).order_by(ordering, '-id')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @action(
         detail=True,
         methods=['post', 'delete'],
         permission_classes=[IsAuthenticated])
     def favorite(self, request, pk):
         if request.method == 'POST':
-            return self.add_to(Favorite, request.user, pk)
-        return self.delete_from(Favorite, request.user, pk)
+            return self.add_one(Favorite, request.user, pk)
+        return self.delete_one(Favorite, request.user, pk)
 
     @action(
         detail=True,
@@ -72,27 +205,102 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def shopping_cart(self, request, pk):
         if request.method == 'POST':
-            return self.add_to(ShoppingList, request.user, pk)
-        return self.delete_from(ShoppingList, request.user, pk)
+            return self.add_one(ShoppingList, request.user, pk)
+        return self.delete_one(ShoppingList, request.user, pk)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='favorite',
+        permission_classes=[IsAuthenticated]
+    )
+    def favorite_batch(self, request):
+        return self.batch(Favorite, request)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='shopping_cart',
+        permission_classes=[IsAuthenticated]
+    )
+    def shopping_cart_batch(self, request):
+        return self.batch(ShoppingList, request)
+
+    def batch(self, model, request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = list(dict.fromkeys(serializer.validated_data['recipes']))
+        if request.method == 'POST':
+            recipes = self.add_to(model, request.user, recipe_ids)
+            statuses = {
+                recipe.id: 'exists' if recipe.is_added else 'added'
+                for recipe in recipes
+            }
+            missing = 'not_found'
+        else:
+            statuses = dict.fromkeys(
+                self.delete_from(model, request.user, recipe_ids), 'removed')
+            missing = 'absent'
+        return Response({'results': [
+            {'id': recipe_id, 'status': statuses.get(recipe_id, missing)}
+            for recipe_id in recipe_ids
+        ]})
 
-    def add_to(self, model, user, pk):
-        if model.objects.filter(user=user, recipe__id=pk).exists():
+    def add_one(self, model, user, pk):
+        recipes = self.add_to(model, user, [pk])
+        if not recipes:
+            raise Http404
+        recipe = recipes[0]
+        if recipe.is_added:
             return Response({'Рецепт уже добавлен!'},
                             status=status.HTTP_400_BAD_REQUEST)
-        recipe = get_object_or_404(Recipe, id=pk)
-        model.objects.create(user=user, recipe=recipe)
         serializer = RecipeWithoutRequestSerializer(recipe)
-        print('Метод add_to сработал')
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    def delete_from(self, model, user, pk):
-        obj = model.objects.filter(user=user, recipe__id=pk)
-        if obj.exists():
-            obj.delete()
+    def delete_one(self, model, user, pk):
+        if self.delete_from(model, user, [pk]):
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response({'Рецепт уже удален!'},
                         status=status.HTTP_400_BAD_REQUEST)
 
+    def lock_user(self, user):
+        # Запросы одного пользователя к избранному и корзине идут по очереди,
+        # иначе оба увидят рецепт ненайденным и применят изменения дважды.
+        User.objects.select_for_update().filter(pk=user.pk).first()
+
+    @transaction.atomic
+    def add_to(self, model, user, recipe_ids):
+        self.lock_user(user)
+        recipes = list(Recipe.objects.filter(pk__in=recipe_ids).annotate(
+            is_added=Exists(model.objects.filter(
+                user=user, recipe=OuterRef('pk')))))
+        added = [recipe.id for recipe in recipes if not recipe.is_added]
+        if not added:
+            return recipes
+        model.objects.bulk_create(
+            (model(user=user, recipe_id=recipe_id) for recipe_id in added),
+            ignore_conflicts=True)
+        update_counters(model, added, 1)
+        if model is ShoppingList:
+            ShoppingCartIngredient.objects.add_recipes(user, added)
+            transaction.on_commit(lambda: bump_cart_versions([user.id]))
+        return recipes
+
+    @transaction.atomic
+    def delete_from(self, model, user, recipe_ids):
+        self.lock_user(user)
+        entries = model.objects.filter(user=user, recipe__in=recipe_ids)
+        removed = set(entries.values_list('recipe', flat=True))
+        if not removed:
+            return removed
+        # Под блокировкой пользователя найденные строки никто не удалит,
+        # поэтому счётчики и корзина обновляются один раз на всю пачку.
+        delete_quietly(entries.filter(recipe__in=removed))
+        update_counters(model, removed, -1)
+        if model is ShoppingList:
+            refresh_carts([user.id])
+        return removed
+
     @action(
         detail=False,
         methods=['get'],
@@ -100,34 +308,78 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def download_shopping_cart(self, request):
         user = request.user
-        if not user.shopping_cart.exists():
+        version = get_cart_version(user.id)
+        etag = f'"{user.id}-{version}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
+        shopping_list = cached_shopping_list(user.id, version)
+        if shopping_list is None:
+            # PDF собирает воркер; клиент повторяет запрос, пока не получит
+            # файл вместо 202.
+            job = self.shopping_list_job(user, version)
+            if job is None:
+                return Response(status=status.HTTP_400_BAD_REQUEST)
+            if job.status != Job.DONE:
+                return self.job_accepted(request, job)
+            shopping_list = cache_shopping_list(user.id, version, job.file)
+        response = FileResponse(
+            shopping_list,
+            as_attachment=True,
+            filename='shopping_list.pdf')
+        response['ETag'] = etag
+        return response
+
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[IsAuthenticated]
+    )
+    def shopping_cart_export(self, request):
+        user = request.user
+        job = self.shopping_list_job(user, get_cart_version(user.id))
+        if job is None:
             return Response(status=status.HTTP_400_BAD_REQUEST)
+        return self.job_accepted(request, job)
+
+    def shopping_list_job(self, user, version):
+        """Задача сборки списка для версии корзины или None при пустой."""
+        job = user.jobs.filter(
+            kind='shopping_list', payload__version=version
+        ).exclude(status=Job.FAILED).first()
+        if job is not None or not user.shopping_cart_ingredients.exists():
+            return job
+        return submit_job('shopping_list', user=user, version=version)
+
+    def job_accepted(self, request, job):
+        serializer = JobSerializer(job, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED,
+                        headers={'Location': reverse(
+                            'job-detail', args=[job.pk], request=request)})
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAdminUser]
+    )
+    def download_shopping_cart_stats(self, request):
+        return Response(get_cache_stats())
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = JobSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return self.request.user.jobs.all()
 
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__shopping_cart__user=request.user
-        ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).order_by('ingredient'
-                   ).annotate(amount=Sum('amount'))
-
-        buffer = io.BytesIO()
-        shopping_list_fin = canvas.Canvas(buffer)
-        pdfmetrics.registerFont(TTFont('TimesNewRoman', 'TimesNewRoman.ttf'))
-        shopping_list_fin.setFont('TimesNewRoman', 14)
-        shopping_list_fin.drawString(
-            100, 750, f'{user.get_full_name()}, вот Ваш Cписок покупок:')
-        y = 700
-
-        for ingredient in ingredients:
-            string = (
-                f'- {ingredient["ingredient__name"]} '
-                f'({ingredient["ingredient__measurement_unit"]})'
-                f' - {ingredient["amount"]}')
-            shopping_list_fin.drawString(100, y, string)
-            y -= 30
-        shopping_list_fin.showPage()
-        shopping_list_fin.save()
-        buffer.seek(0)
-        return FileResponse(buffer, as_attachment=True,
-                            filename='shopping_list.pdf')
+    @action(detail=True)
+    def result(self, request, pk):
+        job = self.get_object()
+        if job.status != Job.DONE or not job.file:
+            serializer = self.get_serializer(job)
+            return Response(serializer.data, status=status.HTTP_409_CONFLICT)
+        return FileResponse(
+            job.file.open('rb'),
+            as_attachment=True,
+            filename=job.file.name.rsplit('/', 1)[-1])
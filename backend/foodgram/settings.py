@@ -99,6 +99,31 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+        'KEY_PREFIX': 'default',
+    },
+    'exports': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'exports',
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {
+            'MAX_ENTRIES': 500,
+        },
+    },
+    'responses': {
+        'BACKEND': os.getenv('RESPONSE_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('RESPONSE_CACHE_LOCATION', default='responses'),
+        'KEY_PREFIX': 'responses',
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -149,7 +174,7 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
@@ -168,6 +193,37 @@ DJOSER = {
     },
     'HIDE_USERS': False,
 }
+INGREDIENTS_SEARCH_LIMIT = 50
+INGREDIENTS_SEARCH_SIMILARITY = 0.2
+SHOPPING_LIST_CACHE_MAX_SIZE = 512 * 1024
+APPROXIMATE_COUNT_THRESHOLD = 10000
+APPROXIMATE_COUNT_TIMEOUT = 60
+AUTH_TOKEN_CACHE_TTL = 5 * 60
+AUTH_TOKEN_LOCAL_TTL = 10
+AUTH_TOKEN_LOCAL_SIZE = 1024
+RECIPES_BATCH_LIMIT = 100
+RANKING_POPULAR_HALF_LIFE = 60 * 60 * 24 * 30
+RANKING_TRENDING_HALF_LIFE = 60 * 60 * 24
+RANKING_LAG = 60
+FEED_FANOUT_LIMIT = 10000
+FEED_FANOUT_RESUME = 9000
+FEED_BACKFILL_SIZE = 100
+SIMILAR_RECIPES_LIMIT = 6
+SIMILAR_RECIPES_CANDIDATES = 200
+IMAGE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+RECIPE_IMAGE_VARIANTS = {'thumb': 160, 'card': 480, 'full': 1280}
+JOB_HANDLERS = {
+    'process_image': 'recipes.images.process_image',
+    'shopping_list': 'api.shopping_list.export_shopping_list',
+    'feed_mode': 'recipes.feed.switch_feed_mode',
+}
+JOBS_WORKERS = 2
+JOBS_POLL_INTERVAL = 1
+JOBS_STALE_AFTER = 10 * 60
+JOBS_MAX_ATTEMPTS = 3
+JOBS_RETENTION = 24 * 60 * 60
+JOBS_EAGER = os.getenv('JOBS_EAGER', default='False') == 'True'
+
 CORS_ORIGIN_ALLOW_ALL = True
 CORS_URLS_REGEX = r'^/api/.*$'
 CORS_ALLOWED_ORIGINS = [
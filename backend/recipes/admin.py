@@ -1,6 +1,8 @@
 from django.contrib import admin
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingList, Tag)
+from recipes.models import (Favorite, Ingredient, Job, Recipe,
+                            RecipeIngredient, RecipeRanking, ShoppingList,
+                            Tag)
+from recipes.similarity import index_recipes
 
 
 class RecipeIngredientInLine(admin.TabularInline):
@@ -10,14 +12,14 @@ class RecipeIngredientInLine(admin.TabularInline):
 
 
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('author', 'name', 'count',)
+    list_display = ('author', 'name', 'favorites_count', 'in_carts_count',)
     list_filter = ('author', 'name', 'tags',)
     inlines = (RecipeIngredientInLine,)
     search_fields = ('name',)
 
-    def count(self, x):
-        return Favorite.objects.filter(
-            recipe=Recipe.objects.get(id=x.id)).count()
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        index_recipes([form.instance.pk])
 
 
 class IngredientAdmin (admin.ModelAdmin):
@@ -56,9 +58,22 @@ class ShopingListAdmin(admin.ModelAdmin):
     list_editable = ('recipe',)
 
 
+class RecipeRankingAdmin(admin.ModelAdmin):
+    list_display = ('recipe', 'popular_score', 'trending_score',)
+    readonly_fields = ('recipe', 'popular_score', 'trending_score',)
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'user', 'status', 'attempts', 'created_at',
+                    'finished_at',)
+    list_filter = ('kind', 'status',)
+
+
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(Tag, TagAdmin)
 admin.site.register(RecipeIngredient, RecipeIngredientAdmin)
 admin.site.register(Favorite, FavoriteAdmin)
 admin.site.register(ShoppingList, ShopingListAdmin)
+admin.site.register(RecipeRanking, RecipeRankingAdmin)
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,48 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from users.models import Follow
+
+from .models import Favorite, Recipe, ShoppingList
+
+User = get_user_model()
+
+COUNTERS = {
+    Favorite: (Recipe, 'recipe', 'favorites_count'),
+    ShoppingList: (Recipe, 'recipe', 'in_carts_count'),
+    Follow: (User, 'author', 'followers_count'),
+    Recipe: (User, 'author', 'recipes_count'),
+}
+
+
+def update_counters(sender, target_ids, delta):
+    target, _, field = COUNTERS[sender]
+    target.objects.filter(pk__in=target_ids).update(
+        **{field: Greatest(F(field) + delta, 0)})
+
+
+def change_counter(instance, delta):
+    sender = type(instance)
+    _, relation, _ = COUNTERS[sender]
+    update_counters(sender, [instance.serializable_value(relation)], delta)
+
+
+def live_count(sender):
+    _, relation, _ = COUNTERS[sender]
+    return Coalesce(Subquery(
+        sender.objects.filter(**{relation: OuterRef('pk')})
+        .order_by()
+        .values(relation)
+        .annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def recount():
+    """Пересчитывает счётчики, возвращает число исправленных строк."""
+    fixed = {}
+    for sender, (target, _, field) in COUNTERS.items():
+        fixed[f'{target._meta.model_name}.{field}'] = target.objects.exclude(
+            **{field: live_count(sender)}
+        ).update(**{field: live_count(sender)})
+    return fixed
@@ -0,0 +1,115 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from users.models import Follow
+
+from .jobs import submit_job
+from .models import FeedEntry, PulledAuthor, Recipe
+
+User = get_user_model()
+
+
+def is_pushed(author_id):
+    return not PulledAuthor.objects.filter(
+        author_id=author_id, backfilling=False).exists()
+
+
+def push_recipe(recipe):
+    """Раскладывает новый рецепт по лентам подписчиков автора.
+
+    Рецепты авторов из PulledAuthor не раскладываются: лента забирает
+    их при чтении.
+    """
+    if not is_pushed(recipe.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=recipe.author_id).values_list('user', flat=True)
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, recipe=recipe, pub_date=recipe.pub_date)
+         for user_id in followers.iterator()),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user, author):
+    if not is_pushed(author.id):
+        return
+    recipes = author.recipes.order_by(
+        '-pub_date', '-id')[:settings.FEED_BACKFILL_SIZE]
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user=user, recipe_id=recipe_id, pub_date=pub_date)
+         for recipe_id, pub_date in recipes.values_list('id', 'pub_date')),
+        ignore_conflicts=True,
+    )
+
+
+def prune(user, author):
+    FeedEntry.objects.filter(user=user, recipe__author=author).delete()
+
+
+def update_feed_mode(author_id):
+    """Переводит автора между раскладкой и чтением при смене числа подписчиков.
+
+    Чтение включается сразу; к раскладке автор возвращается через задачу,
+    которая сначала догружает ленты подписчиков. Порог возврата ниже порога
+    отключения, чтобы автор на границе не переключался туда и обратно.
+    """
+    followers = User.objects.filter(pk=author_id).values_list(
+        'followers_count', flat=True).first()
+    if followers is None:
+        return
+    pulled = PulledAuthor.objects.filter(author_id=author_id).first()
+    if followers > settings.FEED_FANOUT_LIMIT:
+        if pulled is None or pulled.backfilling:
+            PulledAuthor.objects.update_or_create(
+                author_id=author_id, defaults={'backfilling': False})
+            submit_job('feed_mode', author_id=author_id)
+    elif (followers <= settings.FEED_FANOUT_RESUME and pulled is not None
+            and not pulled.backfilling):
+        pulled.backfilling = True
+        pulled.save(update_fields=['backfilling'])
+        submit_job('feed_mode', author_id=author_id)
+
+
+def switch_feed_mode(job):
+    """Задача: догружает или очищает записи ленты после смены режима автора."""
+    author_id = job.payload['author_id']
+    pulled = PulledAuthor.objects.filter(author_id=author_id).first()
+    if pulled is None:
+        return {'mode': 'push'}
+    if not pulled.backfilling:
+        deleted, _ = FeedEntry.objects.filter(
+            recipe__author_id=author_id).delete()
+        return {'mode': 'pull', 'deleted': deleted}
+    author = User.objects.get(pk=author_id)
+    for user in User.objects.filter(follower__author_id=author_id).iterator():
+        backfill(user, author)
+    PulledAuthor.objects.filter(
+        author_id=author_id, backfilling=True).delete()
+    return {'mode': 'push'}
+
+
+def after(queryset, position, id_field):
+    if position is None:
+        return queryset
+    pub_date, pk = position
+    return queryset.filter(
+        Q(pub_date__lt=pub_date)
+        | Q(pub_date=pub_date, **{f'{id_field}__lt': pk}))
+
+
+def feed_positions(user, position, limit):
+    """Возвращает до limit пар (pub_date, recipe_id) ленты после position."""
+    pushed = after(
+        FeedEntry.objects.filter(user=user), position, 'recipe_id'
+    ).order_by('-pub_date', '-recipe_id').values_list(
+        'pub_date', 'recipe_id')
+    pulled = after(
+        Recipe.objects.filter(author__in=Follow.objects.filter(
+            user=user,
+            author__in=PulledAuthor.objects.values('author'),
+        ).values('author')), position, 'id'
+    ).order_by('-pub_date', '-id').values_list('pub_date', 'id')
+    return sorted(
+        set(pushed[:limit]) | set(pulled[:limit]), reverse=True)[:limit]
@@ -0,0 +1,98 @@
+import hashlib
+import os
+import re
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .models import Recipe
+
+IMAGES_DIR = 'recipes/images/'
+ORIGINALS_DIR = 'recipes/originals/'
+VARIANT_FORMAT = 'webp'
+CONTENT_NAME = re.compile(
+    rf'^{IMAGES_DIR}[0-9a-f]{{64}}\.{VARIANT_FORMAT}$')
+
+
+def variant_name(name, variant):
+    if variant == 'full':
+        return name
+    return f'{name[:-len(VARIANT_FORMAT) - 1]}_{variant}.{VARIANT_FORMAT}'
+
+
+def variant_names(name):
+    """Имена всех вариантов изображения; для старых загрузок — оригинал."""
+    if not CONTENT_NAME.match(name):
+        return dict.fromkeys(settings.RECIPE_IMAGE_VARIANTS, name)
+    return {
+        variant: variant_name(name, variant)
+        for variant in settings.RECIPE_IMAGE_VARIANTS
+    }
+
+
+def encode(image, size):
+    variant = image.copy()
+    variant.thumbnail((size, size))
+    buffer = BytesIO()
+    variant.save(buffer, VARIANT_FORMAT, quality=80, method=4)
+    return ContentFile(buffer.getvalue())
+
+
+def content_name(digest):
+    return f'{IMAGES_DIR}{digest}.{VARIANT_FORMAT}'
+
+
+def store_original(upload):
+    """Сохраняет загрузку под именем по хешу содержимого.
+
+    Возвращает имя файла для рецепта и признак готовности: если варианты
+    такого изображения уже есть, возвращается имя полноразмерного,
+    иначе — имя оригинала, а варианты строит задача process_image.
+    """
+    digest = hashlib.sha256()
+    upload.seek(0)
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    name = content_name(digest.hexdigest())
+    if default_storage.exists(name):
+        return name, True
+    extension = os.path.splitext(upload.name)[1].lower()
+    original = f'{ORIGINALS_DIR}{digest.hexdigest()}{extension}'
+    if not default_storage.exists(original):
+        upload.seek(0)
+        default_storage.save(original, upload)
+    return original, False
+
+
+def store_variants(original, name):
+    """Строит варианты изображения из сохранённого оригинала.
+
+    Полноразмерный вариант пишется последним, поэтому его наличие
+    означает, что остальные варианты уже сохранены.
+    """
+    with default_storage.open(original) as file, Image.open(file) as image:
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        variants = sorted(
+            settings.RECIPE_IMAGE_VARIANTS.items(),
+            key=lambda item: item[0] == 'full')
+        for variant, size in variants:
+            default_storage.save(
+                variant_name(name, variant), encode(image, size))
+
+
+def process_image(job):
+    original = job.payload['name']
+    digest = os.path.splitext(os.path.basename(original))[0]
+    name = content_name(digest)
+    if not default_storage.exists(name):
+        store_variants(original, name)
+    recipe = Recipe.objects.filter(
+        pk=job.payload['recipe_id'], image=original).first()
+    if recipe is not None:
+        recipe.image = name
+        recipe.save(update_fields=['image', 'updated_at'])
+    return {'image': name}
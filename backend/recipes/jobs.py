@@ -0,0 +1,77 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def submit_job(kind, user=None, **payload):
+    """Ставит задачу в очередь; выполнит её команда run_jobs."""
+    job = Job.objects.create(kind=kind, user=user, payload=payload)
+    if settings.JOBS_EAGER:
+        transaction.on_commit(lambda: run_job(job))
+    return job
+
+
+def claim_jobs(limit):
+    with transaction.atomic():
+        jobs = list(Job.objects.select_for_update(skip_locked=True).filter(
+            status=Job.PENDING).order_by('created_at')[:limit])
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=Job.RUNNING,
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+    return jobs
+
+
+def run_job(job):
+    try:
+        handler = import_string(settings.JOB_HANDLERS[job.kind])
+        job.result = handler(job)
+        job.status = Job.DONE
+    except Exception as error:
+        logger.exception('Задача %s завершилась с ошибкой', job)
+        job.status = Job.FAILED
+        job.error = str(error)
+    job.finished_at = timezone.now()
+    job.save(update_fields=[
+        'status', 'result', 'file', 'error', 'finished_at'])
+    return job
+
+
+def requeue_stale_jobs():
+    """Возвращает в очередь задачи, чей воркер пропал.
+
+    Задача, которая уже JOBS_MAX_ATTEMPTS раз не дошла до конца, скорее всего
+    сама роняет воркер: она помечается проваленной, а не запускается снова.
+    """
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        started_at__lt=timezone.now() - timedelta(
+            seconds=settings.JOBS_STALE_AFTER))
+    failed = stale.filter(attempts__gte=settings.JOBS_MAX_ATTEMPTS).update(
+        status=Job.FAILED,
+        finished_at=timezone.now(),
+        error=f'Задача не завершилась за {settings.JOBS_MAX_ATTEMPTS} '
+              f'попыток.',
+    )
+    if failed:
+        logger.warning('Задач без повторного запуска: %s', failed)
+    return stale.update(status=Job.PENDING)
+
+
+def purge_jobs():
+    expired = timezone.now() - timedelta(seconds=settings.JOBS_RETENTION)
+    jobs = Job.objects.filter(
+        status__in=[Job.DONE, Job.FAILED], finished_at__lt=expired)
+    for job in jobs.exclude(file=''):
+        job.file.delete(save=False)
+    return jobs.delete()[0]
@@ -0,0 +1,57 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from recipes.feed import feed_positions
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+def join_positions(user, limit):
+    return list(Recipe.objects.filter(
+        author__following__user=user
+    ).order_by('-pub_date', '-id').values_list('pub_date', 'id')[:limit])
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время чтения ленты из FeedEntry с запросом '
+            'через соединение подписок и рецептов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def measure(self, read, users, repeat):
+        timings = []
+        for user in users:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                read(user)
+                timings.append(time.perf_counter() - started)
+        return (statistics.median(timings) * 1000,
+                max(timings) * 1000)
+
+    def handle(self, *args, **options):
+        limit = options['limit']
+        users = list(User.objects.annotate(
+            follows=Count('follower')
+        ).filter(follows__gt=0).order_by('-follows')[:options['users']])
+        if not users:
+            self.stdout.write('Нет пользователей с подписками.')
+            return
+        for user in users:
+            if feed_positions(user, None, limit) != join_positions(
+                    user, limit):
+                self.stdout.write(self.style.WARNING(
+                    f'Лента {user} расходится с запросом через соединение'))
+        for name, read in (
+            ('feed', lambda user: feed_positions(user, None, limit)),
+            ('join', lambda user: join_positions(user, limit)),
+        ):
+            median, worst = self.measure(read, users, options['repeat'])
+            self.stdout.write(
+                f'{name}: медиана {median:.2f} мс, максимум {worst:.2f} мс')
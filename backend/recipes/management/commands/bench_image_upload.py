@@ -0,0 +1,132 @@
+import base64
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT
+from PIL import Image
+from recipes.models import Ingredient, Tag
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+PATHS = ('multipart', 'base64')
+
+
+def peak_rss():
+    """Пиковый RSS процесса в мегабайтах."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пиковый RSS при загрузке рецепта с большим '
+            'изображением через multipart и через base64. Каждый способ '
+            'запускается в отдельном процессе; данные откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=float, default=5)
+        parser.add_argument('--path', choices=PATHS)
+        parser.add_argument(
+            '--image', help='PNG для загрузки; по умолчанию создаётся '
+                            'шумовой PNG размера --size-mb.')
+
+    def make_image(self, path, size):
+        side = int((size / 3) ** 0.5)
+        Image.frombytes('RGB', (side, side), os.urandom(side * side * 3)).save(
+            path, compress_level=1)
+
+    def write_body(self, path, image, target, fields):
+        # Тело пишется в файл по кускам и читается одним куском, чтобы
+        # временные копии при кодировании не попали в пиковый RSS.
+        with open(image, 'rb') as source, open(target, 'wb') as body:
+            if path == 'multipart':
+                for name, value in fields.items():
+                    body.write((
+                        f'--{BOUNDARY}\r\nContent-Disposition: form-data; '
+                        f'name="{name}"\r\n\r\n{json.dumps(value)}\r\n'
+                    ).encode())
+                body.write((
+                    f'--{BOUNDARY}\r\nContent-Disposition: form-data; '
+                    f'name="image"; filename="bench.png"\r\n'
+                    f'Content-Type: image/png\r\n\r\n').encode())
+                shutil.copyfileobj(source, body)
+                body.write(f'\r\n--{BOUNDARY}--\r\n'.encode())
+                return MULTIPART_CONTENT
+            body.write(json.dumps(fields)[:-1].encode())
+            body.write(b', "image": "data:image/png;base64,')
+            for chunk in iter(lambda: source.read(3 * 2 ** 16), b''):
+                body.write(base64.b64encode(chunk))
+            body.write(b'"}')
+            return 'application/json'
+
+    def measure(self, path, image):
+        with transaction.atomic():
+            user = User.objects.create_user(
+                username='bench_image', email='bench_image@example.com',
+                first_name='bench', last_name='bench')
+            tag = Tag.objects.create(
+                name='bench', color='#bench0', slug='bench')
+            ingredient = Ingredient.objects.create(
+                name='bench', measurement_unit='г')
+            client = APIClient(HTTP_HOST='localhost')
+            token = Token.objects.create(user=user)
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+            target = os.path.join(settings.MEDIA_ROOT, 'body')
+            content_type = self.write_body(path, image, target, {
+                'name': f'bench {path}',
+                'text': 'text',
+                'cooking_time': 5,
+                'tags': [tag.id],
+                'ingredients': [{'id': ingredient.id, 'amount': 1}],
+            })
+            with open(target, 'rb') as file:
+                body = file.read()
+            before = peak_rss()
+            started = time.perf_counter()
+            response = client.generic(
+                'POST', '/api/recipes/', body, content_type)
+            elapsed = time.perf_counter() - started
+            after = peak_rss()
+            transaction.set_rollback(True)
+        if response.status_code != 201:
+            raise CommandError(
+                f'{path}: {response.status_code} {response.content[:200]}')
+        self.stdout.write(
+            f'{path}: тело {len(body) / 2 ** 20:.1f} МБ, пиковый RSS '
+            f'{before:.1f} -> {after:.1f} МБ (+{after - before:.1f}), '
+            f'{elapsed * 1000:.0f} мс')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            image = options['image']
+            if image is None:
+                image = os.path.join(directory, 'bench.png')
+                self.make_image(image, options['size_mb'] * 2 ** 20)
+                self.stdout.write(
+                    f'изображение {os.path.getsize(image) / 2 ** 20:.1f} МБ')
+            if options['path'] is not None:
+                with override_settings(MEDIA_ROOT=directory):
+                    self.measure(options['path'], image)
+                return
+            # Пиковый RSS не убывает, поэтому каждый способ меряется
+            # в свежем процессе.
+            for path in PATHS:
+                result = subprocess.run(
+                    [sys.executable, 'manage.py', 'bench_image_upload',
+                     '--path', path, '--image', image],
+                    cwd=settings.BASE_DIR, capture_output=True, text=True)
+                if result.returncode:
+                    raise CommandError(result.stderr)
+                self.stdout.write(result.stdout, ending='')
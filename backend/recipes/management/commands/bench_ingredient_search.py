@@ -0,0 +1,63 @@
+import random
+import statistics
+import time
+
+from api.search import IngredientIndex
+from django.core.management.base import BaseCommand, CommandError
+from recipes.models import Ingredient
+
+
+def typo(word, rng):
+    if len(word) < 4:
+        return word
+    index = rng.randrange(1, len(word) - 1)
+    return word[:index] + word[index + 1] + word[index] + word[index + 2:]
+
+
+class Command(BaseCommand):
+    help = ('Измеряет поиск ингредиентов по индексу в памяти и запросом '
+            'к базе. Каталог загружается командой '
+            'loaddata ingredients.json.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def measure(self, search, queries):
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            search(query)
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings) * 1000, max(timings) * 1000
+
+    def handle(self, *args, **options):
+        names = list(Ingredient.objects.values_list('name', flat=True))
+        if not names:
+            raise CommandError('Каталог ингредиентов пуст.')
+        rng = random.Random(options['seed'])
+        sample = [rng.choice(names).lower()
+                  for _ in range(options['queries'])]
+        prefixes = [name[:rng.randint(1, 4)] for name in sample]
+        typos = [typo(name.split()[0], rng) for name in sample]
+
+        index = IngredientIndex()
+        started = time.perf_counter()
+        index.refresh()
+        self.stdout.write(
+            f'Ингредиентов: {len(names)}, построение индекса '
+            f'{(time.perf_counter() - started) * 1000:.1f} мс')
+
+        for name, search, queries in (
+            ('prefix, index', index.startswith, prefixes),
+            ('prefix, database', lambda query: list(
+                Ingredient.objects.filter(name__istartswith=query)
+                .values('id', 'name', 'measurement_unit')[:50]), prefixes),
+            ('typo, index', index.search, typos),
+            ('typo, database', lambda query: list(
+                Ingredient.objects.filter(name__icontains=query)
+                .values('id', 'name', 'measurement_unit')[:50]), typos),
+        ):
+            median, worst = self.measure(search, queries)
+            self.stdout.write(
+                f'{name}: медиана {median:.3f} мс, максимум {worst:.3f} мс')
@@ -0,0 +1,84 @@
+import statistics
+import time
+from urllib.parse import parse_qs, urlparse
+
+from api.paginations import (ApproximateCountPagination,
+                             RecipeCursorPagination)
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipes.models import Recipe
+from rest_framework.pagination import Cursor
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+User = get_user_model()
+URL = 'http://testserver/api/recipes/'
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время первой и глубокой страницы рецептов при '
+            'постраничной и курсорной пагинации. Данные создаются в '
+            'транзакции и откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=60000)
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--page', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def seed(self, count):
+        author = User.objects.create_user(
+            username='bench_pagination', email='bench_pagination@example.com',
+            first_name='bench', last_name='bench')
+        Recipe.objects.bulk_create(
+            (Recipe(author=author, name=f'recipe {number}', text='text',
+                    image='recipes/images/bench.png', cooking_time=5)
+             for number in range(count)),
+            batch_size=1000,
+        )
+
+    def cursor_params(self, page, limit):
+        if page == 1:
+            return {'limit': limit}
+        pub_date = Recipe.objects.order_by('-pub_date', '-id').values_list(
+            'pub_date', flat=True)[(page - 1) * limit - 1]
+        paginator = RecipeCursorPagination()
+        paginator.base_url = URL
+        link = paginator.encode_cursor(
+            Cursor(offset=0, reverse=False, position=str(pub_date)))
+        return {'limit': limit, 'cursor': parse_qs(
+            urlparse(link).query)['cursor'][0]}
+
+    def measure(self, pagination_class, params, repeat):
+        factory = APIRequestFactory()
+        timings = []
+        for _ in range(repeat):
+            request = Request(factory.get(URL, params))
+            started = time.perf_counter()
+            page = pagination_class().paginate_queryset(
+                Recipe.objects.select_related('author').order_by(
+                    '-pub_date', '-id'), request)
+            rows = len(list(page))
+            timings.append(time.perf_counter() - started)
+        return (statistics.median(timings) * 1000, max(timings) * 1000,
+                rows)
+
+    def handle(self, *args, **options):
+        limit = options['limit']
+        with transaction.atomic():
+            self.seed(options['recipes'])
+            deep = min(options['page'], Recipe.objects.count() // limit)
+            for page in (1, deep):
+                for name, pagination_class, params in (
+                    ('offset', ApproximateCountPagination,
+                     {'limit': limit, 'page': page}),
+                    ('cursor', RecipeCursorPagination,
+                     self.cursor_params(page, limit)),
+                ):
+                    median, worst, rows = self.measure(
+                        pagination_class, params, options['repeat'])
+                    self.stdout.write(
+                        f'{name}, страница {page} ({rows} строк): медиана '
+                        f'{median:.2f} мс, максимум {worst:.2f} мс')
+            transaction.set_rollback(True)
@@ -0,0 +1,95 @@
+import statistics
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает анонимные запросы списка и карточки рецепта с '
+            'промахом и попаданием в кэш ответов. Данные создаются в '
+            'транзакции и откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument(
+            '--backend', choices=['locmem', 'file'], default='locmem')
+
+    def seed(self, count):
+        author = User.objects.create_user(
+            username='bench_cache', email='bench_cache@example.com',
+            first_name='bench', last_name='bench')
+        tags = [Tag.objects.create(name=f'bench {number}',
+                                   color=f'#bench{number}',
+                                   slug=f'bench-{number}')
+                for number in range(3)]
+        ingredients = [Ingredient.objects.create(
+            name=f'bench {number}', measurement_unit='г')
+            for number in range(20)]
+        recipes = []
+        for number in range(count):
+            recipe = Recipe.objects.create(
+                author=author, name=f'recipe {number}', text='text',
+                image='recipes/images/bench.png', cooking_time=5)
+            recipe.tags.set(tags[:number % 3 + 1])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                                 amount=10)
+                for ingredient in ingredients[number % 10:number % 10 + 8])
+            recipes.append(recipe)
+        return recipes
+
+    def measure(self, client, url, miss, repeat):
+        timings = []
+        for _ in range(repeat):
+            if miss:
+                caches['responses'].clear()
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise CommandError(f'{url}: {response.status_code}')
+        return statistics.median(timings) * 1000
+
+    def run(self, options):
+        client = APIClient(HTTP_HOST='localhost')
+        with transaction.atomic():
+            recipes = self.seed(options['recipes'])
+            for name, url in (
+                ('list', '/api/recipes/?limit=6'),
+                ('detail', f'/api/recipes/{recipes[0].id}/'),
+            ):
+                miss = self.measure(client, url, True, options['repeat'])
+                client.get(url)
+                hit = self.measure(client, url, False, options['repeat'])
+                self.stdout.write(
+                    f'{name}: промах {miss:.2f} мс, попадание {hit:.2f} мс, '
+                    f'ускорение {miss / hit:.1f}x')
+            transaction.set_rollback(True)
+
+    def handle(self, *args, **options):
+        if options['backend'] == 'locmem':
+            self.run(options)
+            return
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(CACHES={
+                'default': {
+                    'BACKEND':
+                        'django.core.cache.backends.locmem.LocMemCache',
+                },
+                'responses': {
+                    'BACKEND':
+                        'django.core.cache.backends.filebased.FileBasedCache',
+                    'LOCATION': directory,
+                },
+            }):
+                self.run(options)
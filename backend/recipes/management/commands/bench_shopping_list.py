@@ -0,0 +1,38 @@
+import time
+import tracemalloc
+
+from api.shopping_list import render_shopping_list
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Измеряет время и пиковую память рендера списка покупок '
+            'для заданного числа строк.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'lines', nargs='*', type=int, default=[10, 100, 1000])
+
+    def handle(self, *args, **options):
+        user = User(first_name='Имя', last_name='Фамилия')
+        render_shopping_list(user, [])
+        for lines in options['lines']:
+            ingredients = [{
+                'ingredient__name': f'Ингредиент {number}',
+                'ingredient__measurement_unit': 'г',
+                'amount': number,
+            } for number in range(lines)]
+            tracemalloc.start()
+            started = time.perf_counter()
+            shopping_list = render_shopping_list(user, ingredients)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            pages = shopping_list.read().count(b'/Type /Page\n')
+            shopping_list.close()
+            self.stdout.write(
+                f'{lines:>6} строк  {elapsed * 1000:7.1f} мс  '
+                f'{peak / 1024:7.0f} КиБ  страниц: {pages}')
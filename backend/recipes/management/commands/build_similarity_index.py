@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from recipes.models import RecipeBand
+from recipes.similarity import index_stats, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает индекс похожих рецептов и выводит его размер.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--report',
+            action='store_true',
+            help='Только вывести размер индекса без перестроения.',
+        )
+
+    def table_size(self):
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_total_relation_size(%s)',
+                           [RecipeBand._meta.db_table])
+            return cursor.fetchone()[0]
+
+    def handle(self, *args, **options):
+        if not options['report']:
+            started = time.monotonic()
+            rebuild_index()
+            self.stdout.write(self.style.SUCCESS(
+                f'Индекс перестроен за {time.monotonic() - started:.2f} с'))
+        stats = index_stats()
+        self.stdout.write(
+            f'Рецептов в индексе: {stats["recipes"]}, '
+            f'полос: {stats["bands"]}')
+        size = self.table_size()
+        if size is not None:
+            self.stdout.write(f'Размер таблицы: {size / 1024:.1f} КиБ')
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipes.models import ShoppingCartIngredient
+
+
+class Command(BaseCommand):
+    help = 'Сверяет сводные списки покупок с рецептами в корзинах.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repair',
+            action='store_true',
+            help='Пересчитать списки пользователей с расхождениями.',
+        )
+
+    def handle(self, *args, **options):
+        live = ShoppingCartIngredient.objects.live_totals()
+        stored = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in
+            ShoppingCartIngredient.objects.values_list(
+                'user', 'ingredient', 'amount')
+        }
+        drifted = {
+            user_id for user_id, ingredient_id in live.keys() | stored.keys()
+            if live.get((user_id, ingredient_id))
+            != stored.get((user_id, ingredient_id))
+        }
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
+            return
+        self.stdout.write(self.style.WARNING(
+            f'Расхождения у пользователей: {len(drifted)}'))
+        if options['repair']:
+            with transaction.atomic():
+                ShoppingCartIngredient.objects.refresh(drifted)
+            self.stdout.write(self.style.SUCCESS('Списки пересчитаны.'))
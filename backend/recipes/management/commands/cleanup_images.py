@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from recipes.images import IMAGES_DIR, ORIGINALS_DIR, variant_names
+from recipes.models import Job, Recipe
+
+
+class Command(BaseCommand):
+    help = 'Удаляет файлы изображений, на которые не ссылается ни один рецепт.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, какие файлы будут удалены.',
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=60,
+            help='Не трогать файлы моложе указанного числа минут.',
+        )
+
+    def handle(self, *args, **options):
+        referenced = set()
+        for name in Recipe.objects.exclude(image='').values_list(
+                'image', flat=True).iterator():
+            referenced.update(variant_names(name).values())
+        pending = Job.objects.filter(
+            kind='process_image', status__in=[Job.PENDING, Job.RUNNING])
+        referenced.update(payload.get('name') for payload in
+                          pending.values_list('payload', flat=True))
+        threshold = timezone.now() - timedelta(minutes=options['min_age'])
+        removed = 0
+        for directory in (IMAGES_DIR, ORIGINALS_DIR):
+            if not default_storage.exists(directory):
+                continue
+            _, files = default_storage.listdir(directory)
+            for filename in files:
+                name = directory + filename
+                if (name in referenced or default_storage.get_modified_time(
+                        name) > threshold):
+                    continue
+                if options['dry_run']:
+                    self.stdout.write(name)
+                else:
+                    default_storage.delete(name)
+                removed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Файлов без ссылок: {removed}'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from recipes.ranking import refresh_rankings
+
+
+class Command(BaseCommand):
+    help = 'Обновляет рейтинг популярных рецептов новыми событиями.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересчитать рейтинг по всем событиям с нуля.',
+        )
+
+    def handle(self, *args, **options):
+        updated = refresh_rankings(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено рецептов в рейтинге: {updated}'))
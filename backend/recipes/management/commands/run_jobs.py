@@ -0,0 +1,49 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from recipes.jobs import claim_jobs, purge_jobs, requeue_stale_jobs, run_job
+
+
+def execute(job):
+    try:
+        run_job(job)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди в пуле потоков.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.JOBS_WORKERS,
+            help='Число потоков-исполнителей.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить накопившиеся задачи и завершиться.',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        running = set()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                running = {future for future in running if not future.done()}
+                jobs = claim_jobs(workers - len(running)) if (
+                    len(running) < workers) else []
+                for job in jobs:
+                    running.add(pool.submit(execute, job))
+                if jobs:
+                    continue
+                if options['once'] and not running:
+                    break
+                requeue_stale_jobs()
+                purge_jobs()
+                time.sleep(settings.JOBS_POLL_INTERVAL)
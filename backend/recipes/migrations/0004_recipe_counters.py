@@ -0,0 +1,48 @@
+# Generated by Django 3.2 on 2026-10-18 19:55
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    User = apps.get_model('users', 'User')
+    counters = (
+        (Recipe, 'favorites_count', apps.get_model('recipes', 'Favorite'),
+         'recipe'),
+        (Recipe, 'in_carts_count', apps.get_model('recipes', 'ShoppingList'),
+         'recipe'),
+        (User, 'followers_count', apps.get_model('users', 'Follow'),
+         'author'),
+        (User, 'recipes_count', Recipe, 'author'),
+    )
+    for target, field, source, relation in counters:
+        target.objects.update(**{field: Coalesce(models.Subquery(
+            source.objects.filter(**{relation: models.OuterRef('pk')})
+            .order_by()
+            .values(relation)
+            .annotate(total=models.Count('pk'))
+            .values('total')
+        ), 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipe_updated_at'),
+        ('users', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.2 on 2026-10-18 20:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_pulled_authors(apps, schema_editor):
+    PulledAuthor = apps.get_model('recipes', 'PulledAuthor')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    PulledAuthor.objects.bulk_create(
+        PulledAuthor(author_id=author_id)
+        for author_id in User.objects.filter(
+            followers_count__gt=settings.FEED_FANOUT_LIMIT
+        ).values_list('id', flat=True)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_managers'),
+        ('recipes', '0008_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PulledAuthor',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='pulled_feed', serialize=False, to='users.user', verbose_name='Автор')),
+                ('backfilling', models.BooleanField(default=False, verbose_name='Возвращается к раскладке')),
+            ],
+            options={
+                'verbose_name': 'Автор без раскладки ленты',
+                'verbose_name_plural': 'Авторы без раскладки ленты',
+            },
+        ),
+        migrations.RunPython(fill_pulled_authors, migrations.RunPython.noop),
+    ]
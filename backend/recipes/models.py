@@ -2,6 +2,9 @@ from colorfield.fields import ColorField
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import (BooleanField, Case, Exists, F, IntegerField,
+                              OuterRef, Prefetch, Sum, Value, When)
+from users.models import CounterFieldsMixin
 
 User = get_user_model()
 
@@ -12,6 +15,16 @@ COLORS_PALETTE = [
 ]
 
 
+def delete_quietly(queryset):
+    """Удаляет строки одним DELETE без построчных сигналов post_delete.
+
+    Только для моделей, на которые никто не ссылается внешним ключом:
+    каскад не проверяется. Побочные эффекты удаления вызывающий код
+    применяет сам, один раз на всю пачку. Возвращает число удалённых строк.
+    """
+    return queryset._raw_delete(queryset.db)
+
+
 class Ingredient(models.Model):
     name = models.CharField(
         max_length=200,
@@ -60,7 +73,34 @@ class Tag(models.Model):
         return self.name
 
 
-class Recipe (models.Model):
+class RecipeQuerySet(models.QuerySet):
+
+    def with_user_flags(self, user):
+        if user.is_anonymous:
+            not_set = Value(False, output_field=BooleanField())
+            return self.annotate(
+                is_favorited=not_set,
+                is_in_shopping_cart=not_set,
+            ).select_related('author')
+        authors = User.objects.with_is_subscribed(user)
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingList.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+        ).prefetch_related(Prefetch('author', queryset=authors))
+
+    def with_related(self):
+        return self.prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredient_recipeingredient',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        )
+
+
+class Recipe (CounterFieldsMixin, models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -100,10 +140,30 @@ class Recipe (models.Model):
         auto_now_add=True,
         db_index=True
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения рецепта',
+        auto_now=True,
+        db_index=True
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False,
+        db_index=True
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='В списках покупок',
+        default=0,
+        editable=False
+    )
 
     REQUIRED_FIELDS = ['author', 'name', 'image',
                        'text', 'cooking_time', ]
 
+    counter_fields = ('favorites_count', 'in_carts_count')
+
+    objects = RecipeQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
@@ -155,6 +215,11 @@ class Favorite(models.Model):
         related_name='favorite',
         verbose_name='Рецепт в избранном'
     )
+    created_at = models.DateTimeField(
+        verbose_name='Дата добавления',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         verbose_name = 'Рецепт в избранном'
@@ -182,6 +247,11 @@ class ShoppingList(models.Model):
         related_name='shopping_cart',
         verbose_name='Рецепт для похода в магазин'
     )
+    created_at = models.DateTimeField(
+        verbose_name='Дата добавления',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         verbose_name = 'Рецепт для похода в магазин'
@@ -194,3 +264,303 @@ class ShoppingList(models.Model):
 
     def __str__(self):
         return f'{self.recipe} для магазина у {self.user}'
+
+
+class ShoppingCartIngredientQuerySet(models.QuerySet):
+
+    def live_totals(self, user_ids=None, ingredient_ids=None):
+        filters = {'recipe__shopping_cart__user__isnull': False}
+        if user_ids is not None:
+            filters['recipe__shopping_cart__user__in'] = user_ids
+        if ingredient_ids is not None:
+            filters['ingredient__in'] = ingredient_ids
+        return {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in RecipeIngredient.objects
+            .filter(**filters)
+            .order_by()
+            .values('recipe__shopping_cart__user', 'ingredient')
+            .annotate(total=Sum('amount'))
+            .values_list('recipe__shopping_cart__user', 'ingredient', 'total')
+        }
+
+    def refresh(self, user_ids, ingredient_ids=None):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        rows = self.filter(user__in=user_ids)
+        if ingredient_ids is not None:
+            ingredient_ids = list(ingredient_ids)
+            rows = rows.filter(ingredient__in=ingredient_ids)
+        rows.delete()
+        self.bulk_create(
+            self.model(user_id=user_id, ingredient_id=ingredient_id,
+                       amount=amount)
+            for (user_id, ingredient_id), amount in self.live_totals(
+                user_ids, ingredient_ids).items()
+        )
+
+    def add_recipes(self, user, recipe_ids):
+        amounts = dict(RecipeIngredient.objects.filter(
+            recipe__in=recipe_ids
+        ).order_by().values('ingredient').annotate(
+            total=Sum('amount')
+        ).values_list('ingredient', 'total'))
+        if not amounts:
+            return
+        rows = self.filter(user=user, ingredient__in=amounts)
+        existing = set(rows.values_list('ingredient', flat=True))
+        if existing:
+            rows.filter(ingredient__in=existing).update(
+                amount=F('amount') + Case(
+                    *(When(ingredient=ingredient,
+                           then=Value(amounts[ingredient]))
+                      for ingredient in existing),
+                    output_field=IntegerField(),
+                ))
+        self.bulk_create(
+            self.model(user=user, ingredient_id=ingredient, amount=amount)
+            for ingredient, amount in amounts.items()
+            if ingredient not in existing
+        )
+
+
+class ShoppingCartIngredient(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_ingredients',
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='in_shopping_carts',
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество'
+    )
+
+    objects = ShoppingCartIngredientQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списках покупок'
+        ordering = ['ingredient']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'ingredient'],
+                                    name='unique_shopping_cart_ingredient')
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient} - {self.amount} у {self.user}'
+
+
+class RecipeRanking(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking',
+        verbose_name='Рецепт'
+    )
+    popular_score = models.FloatField(
+        verbose_name='Популярность',
+        db_index=True
+    )
+    trending_score = models.FloatField(
+        verbose_name='Набирает популярность',
+        db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+        ordering = ['-popular_score']
+
+    def __str__(self):
+        return f'{self.recipe}: {self.popular_score:.2f}'
+
+
+class Checkpoint(models.Model):
+    name = models.CharField(
+        max_length=50,
+        unique=True,
+        verbose_name='Задача'
+    )
+    position = models.DateTimeField(
+        verbose_name='Обработано до'
+    )
+
+    class Meta:
+        verbose_name = 'Отметка обработки'
+        verbose_name_plural = 'Отметки обработки'
+
+    def __str__(self):
+        return f'{self.name}: {self.position}'
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации рецепта'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        ordering = ['-pub_date', '-recipe_id']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'recipe'],
+                                    name='unique_feed_entry')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-recipe'],
+                         name='feed_entry_keyset')
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} в ленте у {self.user}'
+
+
+class PulledAuthor(models.Model):
+    """Автор, чьи рецепты лента забирает при чтении, а не раскладывает."""
+
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='pulled_feed',
+        verbose_name='Автор'
+    )
+    backfilling = models.BooleanField(
+        verbose_name='Возвращается к раскладке',
+        default=False
+    )
+
+    class Meta:
+        verbose_name = 'Автор без раскладки ленты'
+        verbose_name_plural = 'Авторы без раскладки ленты'
+
+    def __str__(self):
+        return f'{self.author}'
+
+
+class RecipeBand(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='bands',
+        verbose_name='Рецепт'
+    )
+    band = models.PositiveSmallIntegerField(
+        verbose_name='Полоса'
+    )
+    bucket = models.BigIntegerField(
+        verbose_name='Корзина'
+    )
+
+    class Meta:
+        verbose_name = 'Полоса MinHash'
+        verbose_name_plural = 'Полосы MinHash'
+        constraints = [
+            models.UniqueConstraint(fields=['recipe', 'band'],
+                                    name='unique_recipe_band')
+        ]
+        indexes = [
+            models.Index(fields=['band', 'bucket'], name='recipe_band_bucket')
+        ]
+
+    def __str__(self):
+        return f'{self.recipe}: {self.band}/{self.bucket}'
+
+
+class Job(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    kind = models.CharField(
+        max_length=50,
+        verbose_name='Тип задачи'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='jobs',
+        verbose_name='Пользователь'
+    )
+    payload = models.JSONField(
+        default=dict,
+        verbose_name='Параметры'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING,
+        verbose_name='Статус'
+    )
+    result = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name='Результат'
+    )
+    file = models.FileField(
+        upload_to='jobs/',
+        blank=True,
+        verbose_name='Файл результата'
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name='Ошибка'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Создана'
+    )
+    started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Начата'
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Завершена'
+    )
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'],
+                         name='job_queue')
+        ]
+
+    def __str__(self):
+        return f'{self.kind} #{self.pk}: {self.status}'
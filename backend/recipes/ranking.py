@@ -0,0 +1,83 @@
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Checkpoint, Favorite, RecipeRanking, ShoppingList
+
+CHECKPOINT = 'recipe_ranking'
+EPOCH = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+EVENT_WEIGHTS = (
+    (Favorite, 1.0),
+    (ShoppingList, 2.0),
+)
+
+
+def log_add(first, second):
+    if first is None:
+        return second
+    high, low = max(first, second), min(first, second)
+    return high + math.log1p(math.exp(low - high))
+
+
+def decay_rate(half_life):
+    return math.log(2) / half_life
+
+
+def event_scores(created_at, weight, rates):
+    # Вклад события хранится в логарифме относительно фиксированной эпохи:
+    # затухание одинаково для всех рецептов, и старые суммы не пересчитываются.
+    age = (created_at - EPOCH).total_seconds()
+    return tuple(rate * age + math.log(weight) for rate in rates)
+
+
+def collect_scores(since, until):
+    rates = (
+        decay_rate(settings.RANKING_POPULAR_HALF_LIFE),
+        decay_rate(settings.RANKING_TRENDING_HALF_LIFE),
+    )
+    scores = {}
+    for model, weight in EVENT_WEIGHTS:
+        events = model.objects.filter(created_at__lte=until)
+        if since is not None:
+            events = events.filter(created_at__gt=since)
+        for recipe_id, created_at in events.order_by().values_list(
+                'recipe', 'created_at').iterator():
+            current = scores.get(recipe_id, (None, None))
+            scores[recipe_id] = tuple(
+                log_add(old, new) for old, new in zip(
+                    current, event_scores(created_at, weight, rates)))
+    return scores
+
+
+@transaction.atomic
+def refresh_rankings(full=False):
+    """Добавляет в рейтинг события, появившиеся после прошлого запуска."""
+    until = timezone.now() - timedelta(seconds=settings.RANKING_LAG)
+    if full:
+        RecipeRanking.objects.all().delete()
+        Checkpoint.objects.filter(name=CHECKPOINT).delete()
+    checkpoint = Checkpoint.objects.select_for_update().filter(
+        name=CHECKPOINT).first()
+    scores = collect_scores(checkpoint and checkpoint.position, until)
+    rankings = RecipeRanking.objects.in_bulk(scores)
+    created = []
+    for recipe_id, (popular, trending) in scores.items():
+        ranking = rankings.get(recipe_id)
+        if ranking is None:
+            created.append(RecipeRanking(
+                recipe_id=recipe_id,
+                popular_score=popular,
+                trending_score=trending,
+            ))
+            continue
+        ranking.popular_score = log_add(ranking.popular_score, popular)
+        ranking.trending_score = log_add(ranking.trending_score, trending)
+    RecipeRanking.objects.bulk_create(created)
+    RecipeRanking.objects.bulk_update(
+        rankings.values(), ['popular_score', 'trending_score'])
+    Checkpoint.objects.update_or_create(
+        name=CHECKPOINT, defaults={'position': until})
+    return len(scores)
@@ -0,0 +1,109 @@
+import hashlib
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import Recipe, RecipeBand, RecipeIngredient
+
+BANDS = 32
+ROWS = 2
+PRIME = (1 << 61) - 1
+_random = random.Random(20230624)
+PERMUTATIONS = [
+    (_random.randrange(1, PRIME), _random.randrange(PRIME))
+    for _ in range(BANDS * ROWS)
+]
+
+
+def signature(ingredient_ids):
+    return [
+        min((a * ingredient_id + b) % PRIME
+            for ingredient_id in ingredient_ids)
+        for a, b in PERMUTATIONS
+    ]
+
+
+def buckets(ingredient_ids):
+    if not ingredient_ids:
+        return []
+    values = signature(ingredient_ids)
+    return [
+        (band, int.from_bytes(hashlib.blake2b(
+            repr(values[band * ROWS:(band + 1) * ROWS]).encode(),
+            digest_size=8).digest(), 'big') >> 1)
+        for band in range(BANDS)
+    ]
+
+
+def ingredient_sets(recipe_ids=None):
+    rows = RecipeIngredient.objects.order_by()
+    if recipe_ids is not None:
+        rows = rows.filter(recipe__in=recipe_ids)
+    sets = defaultdict(set)
+    for recipe_id, ingredient_id in rows.values_list(
+            'recipe', 'ingredient').iterator():
+        sets[recipe_id].add(ingredient_id)
+    return sets
+
+
+def make_bands(sets):
+    return [
+        RecipeBand(recipe_id=recipe_id, band=band, bucket=bucket)
+        for recipe_id, ingredient_ids in sets.items()
+        for band, bucket in buckets(ingredient_ids)
+    ]
+
+
+@transaction.atomic
+def index_recipes(recipe_ids):
+    """Пересчитывает полосы MinHash для изменённых рецептов."""
+    RecipeBand.objects.filter(recipe__in=recipe_ids).delete()
+    RecipeBand.objects.bulk_create(make_bands(ingredient_sets(recipe_ids)))
+
+
+@transaction.atomic
+def rebuild_index():
+    RecipeBand.objects.all().delete()
+    RecipeBand.objects.bulk_create(make_bands(ingredient_sets()),
+                                   batch_size=5000)
+
+
+def jaccard(first, second):
+    return len(first & second) / len(first | second)
+
+
+def similar_recipes(recipe_id, ingredient_ids, limit=None):
+    """Возвращает id рецептов с наибольшим сходством по Жаккару.
+
+    Кандидаты берутся только из совпавших корзин LSH, точное сходство
+    считается для не более чем SIMILAR_RECIPES_CANDIDATES из них.
+    """
+    limit = limit or settings.SIMILAR_RECIPES_LIMIT
+    ingredient_ids = set(ingredient_ids)
+    lookups = [Q(band=band, bucket=bucket)
+               for band, bucket in buckets(ingredient_ids)]
+    if not lookups:
+        return []
+    candidates = RecipeBand.objects.filter(
+        Q(*lookups, _connector=Q.OR)
+    ).exclude(recipe=recipe_id).order_by().values('recipe').annotate(
+        shared=Count('pk')
+    ).order_by('-shared', '-recipe_id').values_list(
+        'recipe', flat=True)[:settings.SIMILAR_RECIPES_CANDIDATES]
+    scores = [
+        (jaccard(ingredient_ids, other), other_id)
+        for other_id, other in ingredient_sets(list(candidates)).items()
+    ]
+    scores.sort(reverse=True)
+    return [other_id for _, other_id in scores[:limit]]
+
+
+def index_stats():
+    return {
+        'recipes': Recipe.objects.filter(bands__isnull=False)
+        .distinct().count(),
+        'bands': RecipeBand.objects.count(),
+    }
@@ -6,7 +6,8 @@ User = get_user_model()
 
 
 class UserAdmin(admin.ModelAdmin):
-    list_display = ('email', 'username', 'first_name', 'last_name',)
+    list_display = ('email', 'username', 'first_name', 'last_name',
+                    'followers_count', 'recipes_count',)
     list_filter = ('email', 'last_name',)
 
 
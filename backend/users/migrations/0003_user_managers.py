@@ -0,0 +1,21 @@
+# Generated by Django 3.2 on 2026-10-18 20:16
+
+from django.db import migrations
+import users.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('object', users.models.CustomUserManager()),
+                ('objects', users.models.CustomUserManager()),
+            ],
+        ),
+    ]
@@ -1,8 +1,17 @@
-from api.paginations import LimitPagination
+import hashlib
+import json
+
+from api.paginations import (ApproximateCountPagination,
+                             CursorPaginationMixin, UserCursorPagination)
 from api.serializers import CustomUserSerializer, SubscribeUserSerializer
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import OuterRef, Prefetch, Subquery
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
 from djoser.views import UserViewSet
+from recipes.feed import backfill, prune
+from recipes.models import Recipe
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
@@ -13,16 +22,47 @@ from .models import Follow
 User = get_user_model()
 
 
-class CustomUserView(UserViewSet):
-    quyryset = User.objects.all()
+def delta_encode(ids):
+    encoded = []
+    previous = 0
+    for current in ids:
+        encoded.append(current - previous)
+        previous = current
+    return encoded
+
+
+class CustomUserView(CursorPaginationMixin, UserViewSet):
+    queryset = User.objects.all()
     serializer_class = CustomUserSerializer
-    pagination_class = LimitPagination
+    pagination_class = ApproximateCountPagination
+    cursor_pagination_class = UserCursorPagination
+
+    def get_queryset(self):
+        return super().get_queryset().with_is_subscribed(self.request.user)
+
+    def get_instance(self):
+        user = super().get_instance()
+        user.is_subscribed = False
+        return user
+
+    def annotate_subscriptions(self, queryset):
+        user = self.request.user
+        recipes = Recipe.objects.all()
+        limit = self.request.query_params.get('recipes_limit')
+        if limit and limit.isdigit():
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')).values('pk')[:int(limit)]))
+        return queryset.with_is_subscribed(user).prefetch_related(
+            Prefetch('recipes', queryset=recipes)
+        ).order_by('-id')
 
     @action(
         detail=True,
         methods=['post', 'delete'],
         permission_classes=[IsAuthenticated]
     )
+    @transaction.atomic
     def subscribe(self, request, id):
         user = request.user
         author = get_object_or_404(User, id=id)
@@ -36,12 +76,16 @@ class CustomUserView(UserViewSet):
             if user == author:
                 return Response({'Невозможно подписаться на себя'},
                                 status=status.HTTP_400_BAD_REQUEST)
+            Follow.objects.create(user=user, author=author)
+            backfill(user, author)
+            author = self.annotate_subscriptions(
+                User.objects.filter(pk=author.pk)).get()
             serializer = SubscribeUserSerializer(
                 author, context={'request': request})
-            Follow.objects.create(user=user, author=author)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         if subscription.exists():
             subscription.delete()
+            prune(user, author)
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response({'Вы не подписаны на этого пользователя'},
                         status=status.HTTP_400_BAD_REQUEST)
@@ -52,8 +96,31 @@ class CustomUserView(UserViewSet):
     )
     def subscriptions(self, request):
         user = request.user
-        queryset = User.objects.filter(following__user=user)
+        queryset = self.annotate_subscriptions(
+            User.objects.filter(following__user=user))
         page = self.paginate_queryset(queryset)
         serializer = SubscribeUserSerializer(
             page, many=True, context={'request': request})
         return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        url_path='me/state',
+        permission_classes=[IsAuthenticated]
+    )
+    def state(self, request):
+        user = request.user
+        data = {
+            'favorites': delta_encode(user.favorite.order_by(
+                'recipe_id').values_list('recipe_id', flat=True)),
+            'shopping_cart': delta_encode(user.shopping_cart.order_by(
+                'recipe_id').values_list('recipe_id', flat=True)),
+            'subscriptions': delta_encode(user.follower.order_by(
+                'author_id').values_list('author_id', flat=True)),
+        }
+        etag = '"{}"'.format(hashlib.md5(
+            json.dumps(data).encode()).hexdigest())
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
+        return Response(data, headers={'ETag': etag})
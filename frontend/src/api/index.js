@@ -1,3 +1,6 @@
+const DOWNLOAD_POLL_INTERVAL = 1000
+const DOWNLOAD_POLL_ATTEMPTS = 60
+
 class Api {
   constructor (url, headers) {
     this._url = url
@@ -385,7 +388,7 @@ class Api {
     ).then(this.checkResponse)
   }
 
-  downloadFile () {
+  downloadFile (attempt = 0) {
     const token = localStorage.getItem('token')
     return fetch(
       `/api/recipes/download_shopping_cart/`,
@@ -396,7 +399,19 @@ class Api {
           'authorization': `Token ${token}`
         }
       }
-    ).then(this.checkFileDownloadResponse)
+    ).then(res => {
+      if (res.status !== 202) {
+        return this.checkFileDownloadResponse(res)
+      }
+      // the list is being built in the background: ask again until the file is ready
+      return res.json().then(job => {
+        if (attempt >= DOWNLOAD_POLL_ATTEMPTS) {
+          return Promise.reject(job)
+        }
+        return new Promise(resolve => setTimeout(resolve, DOWNLOAD_POLL_INTERVAL))
+          .then(_ => this.downloadFile(attempt + 1))
+      })
+    })
   }
 }
 